@@ -4,24 +4,26 @@
 # --------------------------------------------------------------------------------------------
 
 from azure.cli.core import AzCommandsLoader
-from ._help import helps
-from .commands import load_command_table
-from ._params import load_arguments
+from ._help import helps  # pylint: disable=unused-import
 
 
 class ConnectCommandsLoader(AzCommandsLoader):
 
     def __init__(self, cli_ctx=None):
         from azure.cli.core.commands import CliCommandType
+        from ._profiling import start_profiling
+        start_profiling()
         custom_type = CliCommandType(operations_tmpl='azext_connect.custom#{}')
         super(ConnectCommandsLoader, self).__init__(
             cli_ctx=cli_ctx, custom_command_type=custom_type)
 
     def load_command_table(self, args):
+        from .commands import load_command_table
         load_command_table(self, args)
         return self.command_table
 
     def load_arguments(self, command):
+        from ._params import load_arguments
         load_arguments(self, command)
 
 
@@ -1,16 +1,382 @@
+import base64
+import gzip
 import json
 import os
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urljoin, urlparse
 import requests
 import urllib3
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from ._json import dumps, loads
+from ._timing import span
 
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 120
+LRO_INITIAL_DELAY = 1
+LRO_MAX_DELAY = 30
+LRO_BACKOFF = 1.5
+LRO_TIMEOUT = 30 * 60
+LRO_TERMINAL_STATES = ['succeeded', 'failed', 'canceled']
+RETRY_MAX_ATTEMPTS = 4
+RETRY_TIMEOUT = 120
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_MAX = 30
+RETRYABLE_STATUS_CODES = [500, 502, 503, 504]
+IDEMPOTENT_METHODS = ['GET', 'HEAD', 'PUT', 'DELETE']
+# request bodies smaller than this are sent uncompressed, gzip would not save a packet
+GZIP_MIN_SIZE = 1024
+# ceiling of the requests per second and burst of the buckets of one subscription, the ARM defaults
+RATE_LIMITS = {
+    'reads': (25.0, 250),
+    'writes': (10.0, 200)
+}
+RATE_LIMIT_MAX_CONCURRENCY = 64
+RATE_LIMIT_MIN_RATE = 0.5
+# requests per second added to the rate of a bucket by every accepted request
+RATE_LIMIT_INCREASE = 0.5
+RATE_LIMIT_DECREASE = 0.5
+# the rate is not decreased twice within this many seconds, one burst of 429s counts once
+RATE_LIMIT_COOLDOWN = 1.0
+# stop speeding up when an x-ms-ratelimit-remaining-* header falls below this
+RATE_LIMIT_LOW_REMAINING = 20
+RATE_LIMIT_POLL = 0.05
+READ_METHODS = ['GET', 'HEAD']
 
-class CupertinoApi(object):
+_session = None
+_session_lock = threading.Lock()
+_rate_limiter = None
+
+
+def _get_env_number(name, default, convert=int):
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return convert(value)
+    except ValueError:
+        raise Exception('Invalid value {0} for environment variable {1}'.format(value, name))
+
+
+# One keep-alive session per process so calls reuse TCP+TLS connections to the Cupertino host.
+# The pool size is fixed by the first caller, so bulk commands create their client up front.
+def get_session(pool_size=None):
+    global _session  # pylint: disable=global-statement
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                if pool_size is None:
+                    pool_size = _get_env_number('CONNECT_POOL_SIZE', DEFAULT_POOL_SIZE)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                # TODO: remove verify=False later. The localhost endpoint cert is not set. So set for workaround.
+                session.verify = False
+                _session = session
+    return _session
+
+
+def get_timeout():
+    return (
+        _get_env_number('CONNECT_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT, float),
+        _get_env_number('CONNECT_READ_TIMEOUT', DEFAULT_READ_TIMEOUT, float)
+    )
+
+
+def parse_retry_after(headers):
+    # Retry-After is either a number of seconds or an HTTP date
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_tz, mktime_tz
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0.0, mktime_tz(parsed) - time.time())
+
+
+class RetryPolicy(object):
+    # Transport retries shared by every request of the clients. Throttled requests (429) were not processed
+    # and are always retried. 5xx replies and connection errors are only retried for requests which are safe
+    # to repeat. The delay honors Retry-After, otherwise it is an exponential backoff with full jitter.
+
+    def __init__(self, max_attempts=None, timeout=None, backoff_base=RETRY_BACKOFF_BASE, backoff_max=RETRY_BACKOFF_MAX):
+        self.max_attempts = max_attempts or _get_env_number('CONNECT_RETRY_MAX_ATTEMPTS', RETRY_MAX_ATTEMPTS)
+        self.timeout = timeout if timeout is not None else _get_env_number('CONNECT_RETRY_TIMEOUT', RETRY_TIMEOUT, float)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def get_delay(self, attempt, started, idempotent, res=None, error=None):
+        # seconds to sleep before the next attempt, or None when the request should not be retried
+        if attempt >= self.max_attempts:
+            return None
+        if error is not None:
+            retryable = idempotent
+        elif res.status_code == 429:
+            retryable = True
+        else:
+            retryable = idempotent and res.status_code in RETRYABLE_STATUS_CODES
+        if not retryable:
+            return None
+        delay = parse_retry_after(res.headers) if res is not None else None
+        if delay is None:
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        if time.time() + delay - started > self.timeout:
+            return None
+        return delay
+
+
+def get_rate_limit_key(method, uri):
+    # (subscription, reads or writes), ARM throttles each of them separately
+    path = urlparse(uri).path
+    lower = path.lower()
+    index = lower.find('/subscriptions/')
+    subscription = lower[index + 15:].split('/', 1)[0] if index >= 0 else None
+    return subscription, 'reads' if method in READ_METHODS else 'writes'
+
+
+def _get_remaining_requests(headers):
+    # the tightest of the x-ms-ratelimit-remaining-* quotas, or None when the service sent none
+    remaining = None
+    for name, value in headers.items():
+        if name.lower().startswith('x-ms-ratelimit-remaining-'):
+            try:
+                value = int(value)
+            except ValueError:
+                continue
+            remaining = value if remaining is None else min(remaining, value)
+    return remaining
+
+
+class _RateLimitBucket(object):
+
+    def __init__(self, rate, burst, concurrency):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.concurrency = float(concurrency)
+        self.in_flight = 0
+        self.updated = time.time()
+        self.blocked_until = 0
+        self.decreased = 0
+        # send times of the requests of the last second
+        self.sent = deque()
+
+    def sent_rate(self, now):
+        # requests sent in the last second, None before any was sent
+        sent = self.sent
+        while sent and sent[0] <= now - 1:
+            sent.popleft()
+        return len(sent) or None
+
+    def count(self, now):
+        self.sent.append(now)
+        self.sent_rate(now)
+
+
+class RateLimiter(object):
+    # Token buckets per subscription and kind of request, shared by the threads and coroutines of the process.
+    # The rate and concurrency of a bucket start at the ceilings, are halved by a 429 and grow back additively
+    # with every accepted request, unless an x-ms-ratelimit-remaining-* header says the quota runs low.
+    # acquire never blocks, it returns how long to wait so both clients can sleep their own way.
+
+    def __init__(self, max_rates=None, max_concurrency=None):
+        if max_rates is None:
+            max_rates = {
+                'reads': _get_env_number('CONNECT_RATE_LIMIT_READS', RATE_LIMITS['reads'][0], float),
+                'writes': _get_env_number('CONNECT_RATE_LIMIT_WRITES', RATE_LIMITS['writes'][0], float)
+            }
+        # a ceiling of 0 turns off the limiting of that kind of request
+        self.max_rates = max_rates
+        self.max_concurrency = max_concurrency or _get_env_number('CONNECT_MAX_CONCURRENCY', RATE_LIMIT_MAX_CONCURRENCY)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _get_bucket(self, key):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            max_rate = self.max_rates.get(key[1])
+            if not max_rate:
+                return None
+            bucket = self._buckets[key] = _RateLimitBucket(
+                max_rate, max(RATE_LIMITS[key[1]][1], max_rate), self.max_concurrency)
+        return bucket
+
+    def acquire(self, key):
+        # 0 when a request may be sent now, which must then be released, else the seconds to wait before trying again
+        with self._lock:
+            bucket = self._get_bucket(key)
+            if bucket is None:
+                return 0
+            now = time.time()
+            if now < bucket.blocked_until:
+                return bucket.blocked_until - now
+            if bucket.in_flight >= int(bucket.concurrency):
+                return RATE_LIMIT_POLL
+            bucket.tokens = min(bucket.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+            bucket.updated = now
+            if bucket.tokens < 1:
+                return (1 - bucket.tokens) / bucket.rate
+            bucket.tokens -= 1
+            bucket.in_flight += 1
+            bucket.count(now)
+            return 0
+
+    def wait(self, key):
+        # block until a request may be sent, return the seconds waited
+        waited = 0
+        delay = self.acquire(key)
+        while delay:
+            time.sleep(delay)
+            waited += delay
+            delay = self.acquire(key)
+        return waited
+
+    def _decrease(self, bucket, now):
+        # False when the bucket was already decreased within the cooldown
+        if now - bucket.decreased < RATE_LIMIT_COOLDOWN:
+            return False
+        bucket.decreased = now
+        # halve what was actually sent, the ceilings may be far above it
+        sent_rate = bucket.sent_rate(now)
+        rate = bucket.rate if sent_rate is None else min(bucket.rate, max(sent_rate, 1.0))
+        bucket.rate = max(RATE_LIMIT_MIN_RATE, rate * RATE_LIMIT_DECREASE)
+        bucket.concurrency = max(1.0, min(bucket.concurrency, bucket.in_flight + 1) * RATE_LIMIT_DECREASE)
+        return True
+
+    def release(self, key, res=None):
+        # res is the response of the request, None when it failed without one
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return
+            bucket.in_flight -= 1
+            if res is None:
+                return
+            now = time.time()
+            if res.status_code == 429:
+                # the 429s of the requests sent before the first one came back all land within the cooldown, pause
+                # the bucket once for them, the RetryPolicy waits out the Retry-After of each throttled request
+                if self._decrease(bucket, now):
+                    bucket.tokens = 0
+                    retry_after = parse_retry_after(res.headers)
+                    bucket.blocked_until = max(bucket.blocked_until, now + (retry_after or 1 / bucket.rate))
+                return
+            remaining = _get_remaining_requests(res.headers)
+            if remaining is not None and remaining < RATE_LIMIT_LOW_REMAINING:
+                # hold the rate and spend no more than the quota the service has left
+                bucket.tokens = min(bucket.tokens, remaining)
+            elif res.status_code < 500:
+                bucket.rate = min(self.max_rates[key[1]], bucket.rate + RATE_LIMIT_INCREASE)
+                bucket.concurrency = min(self.max_concurrency, bucket.concurrency + 1 / bucket.concurrency)
+
+
+def get_rate_limiter():
+    # one limiter per process, so every client of a subscription draws from the same buckets
+    global _rate_limiter  # pylint: disable=global-statement
+    if _rate_limiter is None:
+        with _session_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter()
+    return _rate_limiter
+
+
+def get_token_expiry(token):
+    # seconds since the epoch when a token of get_access_token expires, or None when it is not known
+    if not token:
+        return None
+    if token.get('expires_on'):
+        return float(token['expires_on'])
+    if token.get('expiresOn'):
+        from datetime import datetime
+        try:
+            # local time, as written by azure-cli
+            return time.mktime(datetime.strptime(token['expiresOn'], '%Y-%m-%d %H:%M:%S.%f').timetuple())
+        except ValueError:
+            return None
+    return None
+
+
+def encode_operation(operation):
+    return base64.urlsafe_b64encode(json.dumps(operation).encode('utf-8')).decode('ascii')
+
+
+def decode_operation(handle):
+    try:
+        operation = json.loads(base64.urlsafe_b64decode(handle.encode('ascii')).decode('utf-8'))
+    except (TypeError, ValueError, UnicodeError):
+        operation = None
+    if not isinstance(operation, dict) or 'method' not in operation:
+        raise Exception('Operation handle {0} is not valid'.format(handle))
+    return operation
+
+
+def get_compress_requests():
+    return os.environ.get('CONNECT_COMPRESS_REQUESTS', '').lower() in ['1', 'true', 'yes']
+
+
+def encode_body(data, compress=False):
+    # returns the body and its Content-Encoding, or None when it is sent as is
+    if data is None:
+        return None, None
+    body = dumps(data)
+    if compress and len(body) >= GZIP_MIN_SIZE:
+        return gzip.compress(body), 'gzip'
+    return body, None
+
+
+def _record_request(request_span, attempts, body, res, throttled=0):
+    received = 0
+    if res is not None:
+        # the size on the wire, the content is already decompressed
+        length = res.headers.get('Content-Length')
+        received = int(length) if length and length.isdigit() else len(res.content or b'')
+    request_span.attributes.update({
+        'status_code': res.status_code if res is not None else None,
+        'bytes_sent': len(body) if body else 0,
+        'bytes_received': received,
+        'content_encoding': res.headers.get('Content-Encoding') if res is not None else None,
+        'retries': attempts - 1,
+        # seconds spent waiting for the rate limiter
+        'throttled': throttled
+    })
+
+
+def _make_cached_response(uri, entry):
+    # rebuild a 200 response from a response cache entry
+    res = Response()
+    res.status_code = 200
+    res.url = uri
+    res.encoding = 'utf-8'
+    res._content = entry['body'].encode('utf-8')  # pylint: disable=protected-access
+    res.headers = CaseInsensitiveDict({'Content-Type': 'application/json'})
+    if entry.get('etag'):
+        res.headers['ETag'] = entry['etag']
+    if entry.get('lastModified'):
+        res.headers['Last-Modified'] = entry['lastModified']
+    return res
+
+
+class CupertinoApiBase(object):
+    # URI building, payloads and headers shared by the blocking and the asyncio clients
 
     CONNECTION_URI = '{0}/subscriptions/{1}/resourceGroups/{2}/providers/Microsoft.Cupertino/connections/{3}'
     VALIDATION_URI = '{0}/subscriptions/{1}/resourceGroups/{2}/providers/Microsoft.Cupertino/connections/{3}/validateConnectivity'
     GET_URI = '{0}/subscriptions/{1}/resourceGroups/{2}/providers/Microsoft.Cupertino/connections/{3}'
+    LIST_URI = '{0}/subscriptions/{1}/resourceGroups/{2}/providers/Microsoft.Cupertino/connections'
+    SUBSCRIPTION_LIST_URI = '{0}/subscriptions/{1}/providers/Microsoft.Cupertino/connections'
 
-    def __init__(self, authtoken, graphtoken, sqltoken, mysqltoken):
+    def __init__(self, authtoken, graphtoken=None, sqltoken=None, mysqltoken=None):
         if 'LOCAL_CONN_HOST' in os.environ:
             self._host = os.environ['LOCAL_CONN_HOST']
         else:
@@ -19,8 +385,12 @@ class CupertinoApi(object):
         self._graphtoken = graphtoken
         self._sqltoken = sqltoken
         self._mysqltoken = mysqltoken
-        # disable ssl warnings
-        urllib3.disable_warnings()
+
+    def token_expires_on(self):
+        # when the first of the tokens of this client expires, or None when it is not known
+        expiries = [get_token_expiry(token) for token in [self._authtoken, self._graphtoken, self._sqltoken, self._mysqltoken]]
+        expiries = [expiry for expiry in expiries if expiry is not None]
+        return min(expiries) if expiries else None
 
     def _convert_auth_info(self, auth_info):
         from ._model import AuthType
@@ -35,70 +405,270 @@ class CupertinoApi(object):
         return authInfo
 
     def _make_headers(self):
+        # only send the tokens which were fetched for the target in play
         headers = {
             'Authorization': 'Bearer {0}'.format(self._authtoken['accessToken']),
-            'GraphToken': 'Bearer {0}'.format(self._graphtoken['accessToken']),
-            'SqlToken': 'Bearer {0}'.format(self._sqltoken['accessToken']),
-            'MySqlToken': 'Bearer {0}'.format(self._mysqltoken['accessToken']),
-            'Content-Type': 'application/json'
+            'Content-Type': 'application/json',
+            'Accept-Encoding': 'gzip, deflate'
         }
+        if self._graphtoken:
+            headers['GraphToken'] = 'Bearer {0}'.format(self._graphtoken['accessToken'])
+        if self._sqltoken:
+            headers['SqlToken'] = 'Bearer {0}'.format(self._sqltoken['accessToken'])
+        if self._mysqltoken:
+            headers['MySqlToken'] = 'Bearer {0}'.format(self._mysqltoken['accessToken'])
         return headers
 
-    def _put_connection(self, uri, data):
-        headers = self._make_headers()
-        # TODO: remove verify=False later. The localhost endpoint cert is not set. So set for workaround.
-        data_string = json.dumps(data)
-        res = requests.put(uri, headers=headers, data=data_string, verify=False)
-        return res
-
-    def _post_connection(self, uri, data):
-        headers = self._make_headers()
-        # TODO: remove verify=False later. The localhost endpoint cert is not set. So set for workaround.
-        data_string = json.dumps(data)
-        res = requests.post(uri, headers=headers, data=data_string, verify=False)
-        return res
-
-    def _get_connection(self, uri, data):
-        headers = self._make_headers()
-        # TODO: remove verify=False later. The localhost endpoint cert is not set. So set for workaround.
-        data_string = json.dumps(data)
-        res = requests.get(uri, headers=headers, data=data_string, verify=False)
-        return res
-
-    def create(self, subscription, rg, name, source, target, auth_info, additional_info=None):
-        # TODO: call self._put_connection and do error handling
-        uri = CupertinoApi.CONNECTION_URI.format(self._host, subscription, rg, name)
-        properties = {
+    def connection_properties(self, source, target, auth_info, additional_info=None):
+        # the properties a create sends, also compared with the current ones by apply
+        return {
             'sourceId': source,
             'targetId': target,
             'authInfo': self._convert_auth_info(auth_info),
             'additionalInfo': additional_info
         }
+
+    def _create_request(self, subscription, rg, name, source, target, auth_info, additional_info=None):
+        uri = CupertinoApiBase.CONNECTION_URI.format(self._host, subscription, rg, name)
         data = {
             'name': name,
-            'properties': properties
+            'properties': self.connection_properties(source, target, auth_info, additional_info)
         }
-        res = self._put_connection(uri, data)
-        return res
+        return uri, data
 
-    def validate(self, subscription, rg, name):
-        uri = CupertinoApi.VALIDATION_URI.format(self._host, subscription, rg, name)
+    def _validate_request(self, subscription, rg, name):
+        uri = CupertinoApiBase.VALIDATION_URI.format(self._host, subscription, rg, name)
         properties = {
         }
         data = {
             'name': name,
             'properties': properties
         }
-        res = self._post_connection(uri, data)
-        return res
+        return uri, data
 
-    def get(self, subscription, rg, name):
-        uri = CupertinoApi.GET_URI.format(self._host, subscription, rg, name)
+    def _get_request(self, subscription, rg, name):
+        uri = CupertinoApiBase.GET_URI.format(self._host, subscription, rg, name)
         properties = {
         }
         data = {
             'name': name,
             'properties': properties
         }
-        res = self._get_connection(uri, data)
+        return uri, data
+
+    def _get_operation(self, method, uri, res):
+        # describe the long running operation started by res, or None when res is already final
+        if res.status_code not in [201, 202]:
+            return None
+        async_url = res.headers.get('Azure-AsyncOperation')
+        location = res.headers.get('Location')
+        if not async_url and not location:
+            return None
+        connection_uri = uri[:-len('/validateConnectivity')] if uri.endswith('/validateConnectivity') else uri
+        segments = urlparse(connection_uri).path.split('/')
+        return {
+            'method': method,
+            'uri': uri,
+            'connectionUri': connection_uri,
+            'name': segments[-1],
+            'resourceGroup': segments[segments.index('resourceGroups') + 1] if 'resourceGroups' in segments else None,
+            'asyncOperationUrl': urljoin(uri, async_url) if async_url else None,
+            'locationUrl': urljoin(uri, location) if location else None
+        }
+
+    def _poll_operation(self, operation, retry_after=None):
+        # Generator which drives the polling of a long running operation. It yields (delay, url) for every
+        # GET to send after sleeping delay seconds, receives the response and returns the final one.
+        host = urlparse(self._host)[:2]
+        for url in [operation['asyncOperationUrl'], operation['locationUrl'], operation['connectionUri']]:
+            # the polling requests carry the access tokens, never follow a URL outside of the Cupertino host
+            if url and urlparse(url)[:2] != host:
+                raise Exception('Operation URL {0} is not on {1}'.format(url, self._host))
+        deadline = time.time() + self._lro_timeout
+        delay = LRO_INITIAL_DELAY
+        wait = delay if retry_after is None else retry_after
+        status_url = operation['asyncOperationUrl'] or operation['locationUrl']
+        while True:
+            if time.time() + wait > deadline:
+                raise Exception('Timed out waiting for the operation on {0}'.format(operation['uri']))
+            res = yield wait, status_url
+            if res.ok is not True:
+                return res
+            # back off while the operation runs unless the service says when to come back
+            delay = min(delay * LRO_BACKOFF, LRO_MAX_DELAY)
+            retry_after = parse_retry_after(res.headers)
+            wait = delay if retry_after is None else retry_after
+            if not operation['asyncOperationUrl']:
+                if res.status_code == 202:
+                    continue
+                return res
+            status = (loads(res.content).get('status') or '').lower()
+            if status not in LRO_TERMINAL_STATES:
+                continue
+            if status != 'succeeded':
+                err_msg = 'Operation on {0} ended with status {1}. Detail:{2}'.format(operation['uri'], status, res.text)
+                raise Exception(err_msg)
+            if operation['method'] == 'PUT':
+                res = yield 0, operation['connectionUri']
+            elif operation['locationUrl']:
+                res = yield 0, operation['locationUrl']
+            return res
+
+    def _list_uri(self, subscription, rg=None):
+        if rg:
+            return CupertinoApiBase.LIST_URI.format(self._host, subscription, rg)
+        return CupertinoApiBase.SUBSCRIPTION_LIST_URI.format(self._host, subscription)
+
+    def _parse_list_page(self, scope, res):
+        if res.ok is not True:
+            err_msg = 'Fail to list the connections in {0}. Code:{1}. Detail:{2}'.format(scope, res.status_code, res.text)
+            raise Exception(err_msg)
+        page = loads(res.content)
+        next_link = page.get('nextLink')
+        # the next page is requested with the access tokens, never follow a link outside of the Cupertino host
+        if next_link and urlparse(next_link)[:2] != urlparse(self._host)[:2]:
+            raise Exception('Next page URL {0} is not on {1}'.format(next_link, self._host))
+        return page.get('value', []), next_link
+
+
+class CupertinoApi(CupertinoApiBase):
+
+    def __init__(
+        self, authtoken, graphtoken=None, sqltoken=None, mysqltoken=None, pool_size=None, timeout=None, response_cache=None,
+        lro_timeout=LRO_TIMEOUT, retry_policy=None, compress_requests=None, rate_limiter=None
+    ):
+        super(CupertinoApi, self).__init__(authtoken, graphtoken, sqltoken, mysqltoken)
+        self._compress_requests = get_compress_requests() if compress_requests is None else compress_requests
+        self._lro_timeout = lro_timeout
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._rate_limiter = rate_limiter or get_rate_limiter()
+        self._timeout = timeout or get_timeout()
+        self._response_cache = response_cache
+        self._session = get_session(pool_size)
+        # disable ssl warnings
+        urllib3.disable_warnings()
+
+    def _send(self, method, uri, data, extra_headers=None, idempotent=None):
+        headers = self._make_headers()
+        if extra_headers:
+            headers.update(extra_headers)
+        with span('json.encode'):
+            body, encoding = encode_body(data, self._compress_requests)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        started = time.time()
+        attempt = 0
+        rate_limit_key = get_rate_limit_key(method, uri)
+        throttled = 0
+        with span('http.request', method=method, url=uri) as request_span:
+            while True:
+                attempt += 1
+                res, error = None, None
+                throttled += self._rate_limiter.wait(rate_limit_key)
+                try:
+                    res = self._session.request(method, uri, headers=headers, data=body, timeout=self._timeout)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+                finally:
+                    self._rate_limiter.release(rate_limit_key, res)
+                delay = self._retry_policy.get_delay(attempt, started, idempotent, res, error)
+                if delay is None:
+                    _record_request(request_span, attempt, body, res, throttled)
+                    if error is not None:
+                        raise error
+                    return res
+                time.sleep(delay)
+
+    def _put_connection(self, uri, data):
+        return self._send('PUT', uri, data)
+
+    def _post_connection(self, uri, data, idempotent=False):
+        return self._send('POST', uri, data, idempotent=idempotent)
+
+    def _get_connection(self, uri, data, extra_headers=None):
+        return self._send('GET', uri, data, extra_headers)
+
+    def _invalidate(self, subscription, rg, name):
+        if self._response_cache is not None:
+            self._response_cache.pop(CupertinoApi.GET_URI.format(self._host, subscription, rg, name))
+
+    def _poll(self, operation, retry_after=None):
+        steps = self._poll_operation(operation, retry_after)
+        res = None
+        try:
+            while True:
+                delay, url = steps.send(res)
+                if delay:
+                    time.sleep(delay)
+                res = self._get_connection(url, None)
+        except StopIteration as e:
+            res = e.value
+        if self._response_cache is not None:
+            self._response_cache.pop(operation['connectionUri'])
+        return res
+
+    def _complete(self, method, uri, res, no_wait):
+        operation = self._get_operation(method, uri, res)
+        if operation is None or no_wait:
+            return res
+        return self._poll(operation, parse_retry_after(res.headers))
+
+    def get_operation(self, res):
+        # handle of the long running operation started by res, to be resumed later with wait
+        operation = self._get_operation(res.request.method, res.url, res)
+        return encode_operation(operation) if operation else None
+
+    def wait(self, handle):
+        return self._poll(decode_operation(handle))
+
+    def create(self, subscription, rg, name, source, target, auth_info, additional_info=None, no_wait=False):
+        uri, data = self._create_request(subscription, rg, name, source, target, auth_info, additional_info)
+        self._invalidate(subscription, rg, name)
+        res = self._put_connection(uri, data)
+        return self._complete('PUT', uri, res, no_wait)
+
+    def validate(self, subscription, rg, name, no_wait=False):
+        uri, data = self._validate_request(subscription, rg, name)
+        self._invalidate(subscription, rg, name)
+        # validateConnectivity only reads the connection, so it is safe to repeat
+        res = self._post_connection(uri, data, idempotent=True)
+        return self._complete('POST', uri, res, no_wait)
+
+    def get(self, subscription, rg, name, use_cache=True, max_age=None):
+        # max_age=0 always revalidates a cached response with the service
+        uri, data = self._get_request(subscription, rg, name)
+        cache = self._response_cache
+        if cache is None:
+            return self._get_connection(uri, data)
+        entry, age = cache.lookup(uri) if use_cache else (None, None)
+        if entry is not None and age < (cache.max_age if max_age is None else max_age):
+            return _make_cached_response(uri, entry)
+        extra_headers = {}
+        if entry is not None and entry.get('etag'):
+            extra_headers['If-None-Match'] = entry['etag']
+        if entry is not None and entry.get('lastModified'):
+            extra_headers['If-Modified-Since'] = entry['lastModified']
+        res = self._get_connection(uri, data, extra_headers)
+        if res.status_code == 304 and entry is not None:
+            # still current, serve the cached body and restart its max-age
+            cache.touch(uri)
+            return _make_cached_response(uri, entry)
+        if res.ok:
+            cache.set(uri, {
+                'etag': res.headers.get('ETag'),
+                'lastModified': res.headers.get('Last-Modified'),
+                'body': res.text
+            })
+        else:
+            cache.pop(uri)
         return res
+
+    def list(self, subscription, rg=None):
+        # follow nextLink page by page, so only one page is held in memory however many connections exist
+        uri = self._list_uri(subscription, rg)
+        while uri:
+            connections, uri = self._parse_list_page(rg or subscription, self._get_connection(uri, None))
+            for connection in connections:
+                yield connection
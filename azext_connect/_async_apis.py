@@ -0,0 +1,162 @@
+import asyncio
+import time
+from ._apis import (CupertinoApiBase, RetryPolicy, DEFAULT_POOL_SIZE, IDEMPOTENT_METHODS, LRO_TIMEOUT, get_timeout,
+                    get_compress_requests, get_rate_limiter, get_rate_limit_key, encode_operation, decode_operation,
+                    encode_body, parse_retry_after, _get_env_number, _record_request)
+from ._json import loads
+from ._timing import span
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncResponse(object):
+    # the subset of requests.Response used by callers of CupertinoApi
+
+    def __init__(self, method, url, status_code, headers, content):
+        self.method = method
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return loads(self.content)
+
+
+class AsyncCupertinoApi(CupertinoApiBase):
+    # asyncio counterpart of CupertinoApi. All calls of one instance share a single aiohttp
+    # connection pool, so use it as "async with AsyncCupertinoApi(...) as api" or call close().
+
+    def __init__(
+        self, authtoken, graphtoken=None, sqltoken=None, mysqltoken=None, pool_size=None, timeout=None,
+        lro_timeout=LRO_TIMEOUT, retry_policy=None, compress_requests=None, rate_limiter=None
+    ):
+        if aiohttp is None:
+            raise ImportError('aiohttp is required by AsyncCupertinoApi. Install it with "pip install aiohttp".')
+        super(AsyncCupertinoApi, self).__init__(authtoken, graphtoken, sqltoken, mysqltoken)
+        self._compress_requests = get_compress_requests() if compress_requests is None else compress_requests
+        self._lro_timeout = lro_timeout
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._rate_limiter = rate_limiter or get_rate_limiter()
+        connect_timeout, read_timeout = timeout or get_timeout()
+        self._timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self._pool_size = pool_size or _get_env_number('CONNECT_POOL_SIZE', DEFAULT_POOL_SIZE)
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            # TODO: verify the certificate once the localhost endpoint cert is set, same as CupertinoApi.
+            connector = aiohttp.TCPConnector(limit=self._pool_size, ssl=False)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self._timeout)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _wait_rate_limit(self, key):
+        # same buckets as the blocking client, but sleep without holding up the event loop
+        waited = 0
+        delay = self._rate_limiter.acquire(key)
+        while delay:
+            await asyncio.sleep(delay)
+            waited += delay
+            delay = self._rate_limiter.acquire(key)
+        return waited
+
+    async def _send(self, method, uri, data, idempotent=None):
+        headers = self._make_headers()
+        with span('json.encode'):
+            body, encoding = encode_body(data, self._compress_requests)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        started = time.time()
+        attempt = 0
+        rate_limit_key = get_rate_limit_key(method, uri)
+        throttled = 0
+        with span('http.request', method=method, url=uri) as request_span:
+            while True:
+                attempt += 1
+                res, error = None, None
+                throttled += await self._wait_rate_limit(rate_limit_key)
+                try:
+                    async with self._get_session().request(method, uri, headers=headers, data=body) as raw:
+                        content = await raw.read()
+                        res = AsyncResponse(method, uri, raw.status, raw.headers, content)
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    error = e
+                finally:
+                    self._rate_limiter.release(rate_limit_key, res)
+                delay = self._retry_policy.get_delay(attempt, started, idempotent, res, error)
+                if delay is None:
+                    _record_request(request_span, attempt, body, res, throttled)
+                    if error is not None:
+                        raise error
+                    return res
+                await asyncio.sleep(delay)
+
+    async def _poll(self, operation, retry_after=None):
+        steps = self._poll_operation(operation, retry_after)
+        res = None
+        try:
+            while True:
+                delay, url = steps.send(res)
+                if delay:
+                    await asyncio.sleep(delay)
+                res = await self._send('GET', url, None)
+        except StopIteration as e:
+            return e.value
+
+    async def _complete(self, method, uri, res, no_wait):
+        operation = self._get_operation(method, uri, res)
+        if operation is None or no_wait:
+            return res
+        return await self._poll(operation, parse_retry_after(res.headers))
+
+    def get_operation(self, res):
+        operation = self._get_operation(res.method, res.url, res)
+        return encode_operation(operation) if operation else None
+
+    async def wait(self, handle):
+        return await self._poll(decode_operation(handle))
+
+    async def create(self, subscription, rg, name, source, target, auth_info, additional_info=None, no_wait=False):
+        uri, data = self._create_request(subscription, rg, name, source, target, auth_info, additional_info)
+        res = await self._send('PUT', uri, data)
+        return await self._complete('PUT', uri, res, no_wait)
+
+    async def validate(self, subscription, rg, name, no_wait=False):
+        uri, data = self._validate_request(subscription, rg, name)
+        res = await self._send('POST', uri, data, idempotent=True)
+        return await self._complete('POST', uri, res, no_wait)
+
+    async def get(self, subscription, rg, name):
+        uri, data = self._get_request(subscription, rg, name)
+        return await self._send('GET', uri, data)
+
+    async def list(self, subscription, rg=None):
+        uri = self._list_uri(subscription, rg)
+        while uri:
+            connections, uri = self._parse_list_page(rg or subscription, await self._send('GET', uri, None))
+            for connection in connections:
+                yield connection
@@ -0,0 +1,180 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def get_cache_dir():
+    from azure.cli.core._environment import get_config_dir
+    return os.path.join(get_config_dir(), 'connect')
+
+
+def _make_cache_dir(path):
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path), 0o700)
+
+
+@contextmanager
+def _file_lock(path):
+    # exclusive lock shared with the other processes, held while a cache file is read and written again
+    _make_cache_dir(path)
+    fd = os.open('{0}.lock'.format(path), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        if os.name == 'nt':
+            import msvcrt
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)
+
+
+class FileCache(object):
+    # JSON file backed cache with a time to live per entry. The file is read once per process and
+    # the entries are then served from memory. Changes are kept in memory too and written once, by
+    # flush or when the process exits.
+
+    def __init__(self, file_name, ttl):
+        self._file_name = file_name
+        self._ttl = ttl
+        self._entries = None
+        self._dirty = False
+        self._flush_registered = False
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return os.path.join(get_cache_dir(), self._file_name)
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path) as f:
+                    self._entries = json.load(f, object_pairs_hook=OrderedDict)
+            except (IOError, OSError, ValueError):
+                self._entries = OrderedDict()
+        return self._entries
+
+    def _save(self):
+        now = time.time()
+        entries = OrderedDict((key, entry) for key, entry in self._entries.items() if now - entry['time'] < self._ttl)
+        path = self.path
+        tmp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+        try:
+            _make_cache_dir(path)
+            # write a private temp file and swap it in so readers never see a partial file
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, path)
+        except (IOError, OSError) as e:
+            logger.debug('Fail to write cache file %s: %s', path, e)
+
+    def _changed(self):
+        self._dirty = True
+        if not self._flush_registered:
+            self._flush_registered = True
+            atexit.register(self.flush)
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                self._dirty = False
+                self._save()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._load().get(key)
+        if entry and time.time() - entry['time'] < self._ttl:
+            return entry['value']
+        return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._load()[key] = {'value': value, 'time': time.time()}
+            self._changed()
+
+    def pop(self, key):
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._changed()
+
+
+class ResponseCache(FileCache):
+    # Cache of GET responses for conditional requests. Entries younger than max_age are served as
+    # they are, older ones are revalidated with their ETag or Last-Modified. The least recently
+    # used entries are evicted once there are more than max_entries.
+
+    def __init__(self, file_name, max_age, max_entries, ttl):
+        super(ResponseCache, self).__init__(file_name, ttl)
+        self.max_age = max_age
+        self._max_entries = max_entries
+
+    def lookup(self, key):
+        # return the cached entry and its age in seconds, or (None, None)
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(key)
+            if entry is not None:
+                entries.move_to_end(key)
+        if entry is None or time.time() - entry['time'] >= self._ttl:
+            return None, None
+        return entry['value'], time.time() - entry['time']
+
+    def set(self, key, value):
+        with self._lock:
+            entries = self._load()
+            entries.pop(key, None)
+            entries[key] = {'value': value, 'time': time.time()}
+            while len(entries) > self._max_entries:
+                entries.popitem(last=False)
+            self._changed()
+
+    def touch(self, key):
+        # restart the max-age of an entry the service revalidated, for this process only: a 304 is not
+        # worth writing the file for, the next process revalidates it once more
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is not None:
+                entry['time'] = time.time()
+
+
+class TokenCache(FileCache):
+    # Access tokens shared by the commands of every process. A token is served until refresh_skew seconds
+    # before it expires. Writes hold a file lock and merge with the tokens other processes wrote meanwhile.
+
+    def __init__(self, file_name, refresh_skew, ttl):
+        super(TokenCache, self).__init__(file_name, ttl)
+        self._refresh_skew = refresh_skew
+
+    def get_token(self, key):
+        with self._lock:
+            entry = self._load().get(key)
+        if entry and entry['expiresOn'] - time.time() > self._refresh_skew:
+            return entry['value']
+        return None
+
+    def set_token(self, key, token, expires_on):
+        with self._lock:
+            try:
+                with _file_lock(self.path):
+                    self._entries = None
+                    now = time.time()
+                    entries = OrderedDict((k, entry) for k, entry in self._load().items() if entry['expiresOn'] > now)
+                    entries[key] = {'value': token, 'time': now, 'expiresOn': expires_on}
+                    self._entries = entries
+                    self._save()
+            except (IOError, OSError) as e:
+                logger.debug('Fail to lock cache file %s: %s', self.path, e)
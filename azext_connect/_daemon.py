@@ -0,0 +1,266 @@
+import os
+import sys
+
+# run as a script, the directory of the extension comes first on sys.path and its modules would shadow the standard
+# library ones, e.g. _json.py the C accelerator of json
+if __name__ == '__main__' and sys.path and os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+    del sys.path[0]
+
+import argparse  # noqa: E402 pylint: disable=wrong-import-position
+import json  # noqa: E402 pylint: disable=wrong-import-position
+import signal  # noqa: E402 pylint: disable=wrong-import-position
+import socket  # noqa: E402 pylint: disable=wrong-import-position
+import threading  # noqa: E402 pylint: disable=wrong-import-position
+from concurrent.futures import ThreadPoolExecutor  # noqa: E402 pylint: disable=wrong-import-position
+
+# Requests and responses are JSON lines. A request has a command, an optional id which is copied to its
+# response, and the arguments of the command:
+#     {"id": 1, "command": "bind", "name": ..., "resourceGroup": ..., "source": ..., "target": ..., "auth": ...}
+#     {"id": 2, "command": "validate", "name": ..., "resourceGroup": ..., "noWait": false}
+#     {"id": 3, "command": "get", "name": ..., "resourceGroup": ..., "noCache": false}
+#     {"command": "ping"} and {"command": "shutdown"}
+# A bind request takes the same properties as an entry of a batch-bind manifest. The response is the result
+# of the entry as printed by batch-bind, with the id of the request.
+SOCKET_FILE_NAME = 'daemon.sock'
+ACCEPT_TIMEOUT = 0.5
+
+
+def get_client_path():
+    # this module only needs the standard library, run as a script it is the thin client and loads neither
+    # the package nor azure-cli, wherever the extension is installed
+    return os.path.abspath(__file__)
+
+
+def get_socket_path():
+    # the cache directory, found without loading azure-cli so the client starts fast
+    config_dir = os.getenv('AZURE_CONFIG_DIR') or os.path.expanduser(os.path.join('~', '.azure'))
+    return os.path.join(config_dir, 'connect', SOCKET_FILE_NAME)
+
+
+def _check_unix_socket():
+    if not hasattr(socket, 'AF_UNIX'):
+        raise Exception('The connect daemon needs Unix domain sockets, which are not supported on this platform')
+
+
+def _encode(obj):
+    return json.dumps(obj).encode('utf-8') + b'\n'
+
+
+class DaemonServer(object):
+    # Serves requests on a Unix socket. The lines of every client are handled by one pool of max_parallel
+    # workers, so a client can send many requests without waiting and gets the responses as they complete.
+
+    def __init__(self, path, handler, max_parallel):
+        _check_unix_socket()
+        self.path = path
+        self._handler = handler
+        self._executor = ThreadPoolExecutor(max_workers=max_parallel)
+        self._stopped = threading.Event()
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except (IOError, OSError):
+            # left behind by a daemon which did not exit cleanly
+            os.remove(self.path)
+            return
+        finally:
+            probe.close()
+        raise Exception('A connect daemon is already listening on {0}'.format(self.path))
+
+    def _bind(self):
+        self._remove_stale_socket()
+        if not os.path.isdir(os.path.dirname(self.path)):
+            os.makedirs(os.path.dirname(self.path), 0o700)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # only the user who started the daemon may connect, as it acts with their tokens
+        umask = os.umask(0o177)
+        try:
+            server.bind(self.path)
+        finally:
+            os.umask(umask)
+        server.listen(64)
+        server.settimeout(ACCEPT_TIMEOUT)
+        return server
+
+    def shutdown(self):
+        self._stopped.set()
+
+    def serve_forever(self):
+        server = self._bind()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: self.shutdown())
+        try:
+            while not self._stopped.is_set():
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    continue
+                conn.settimeout(None)
+                thread = threading.Thread(target=self._handle_connection, args=(conn,))
+                thread.daemon = True
+                thread.start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._executor.shutdown(wait=True)
+
+    def _handle(self, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('A request should be a JSON object')
+        except ValueError as e:
+            return {'status': 'Failed', 'error': 'Invalid request: {0}'.format(e)}
+        command = request.get('command')
+        if command == 'ping':
+            response = {'status': 'Succeeded', 'result': {'pid': os.getpid()}}
+        elif command == 'shutdown':
+            self.shutdown()
+            response = {'status': 'Succeeded'}
+        else:
+            try:
+                response = self._handler(request)
+            except Exception as e:  # pylint: disable=broad-except
+                response = {'name': request.get('name'), 'status': 'Failed', 'error': str(e)}
+        response['id'] = request.get('id')
+        return response
+
+    def _respond(self, conn, write_lock, line):
+        response = self._handle(line)
+        try:
+            with write_lock:
+                conn.sendall(_encode(response))
+        except (IOError, OSError):
+            # the client went away, the request was still carried out
+            pass
+
+    def _handle_connection(self, conn):
+        write_lock = threading.Lock()
+        futures = []
+        try:
+            with conn.makefile('rb') as lines:
+                for line in lines:
+                    if line.strip():
+                        futures.append(self._executor.submit(self._respond, conn, write_lock, line))
+            for future in futures:
+                future.result()
+        finally:
+            conn.close()
+
+
+def send_requests(requests, path=None):
+    # send the requests to a running daemon and yield the responses in the order they complete
+    _check_unix_socket()
+    path = path or get_socket_path()
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+    except (IOError, OSError):
+        client.close()
+        raise Exception('No connect daemon is listening on {0}. Start one with "az connect serve"'.format(path))
+
+    errors = []
+
+    def _write():
+        try:
+            for request in requests:
+                client.sendall(_encode(request))
+        except Exception as e:  # pylint: disable=broad-except
+            errors.append(e)
+        finally:
+            try:
+                client.shutdown(socket.SHUT_WR)
+            except (IOError, OSError):
+                pass
+
+    writer = threading.Thread(target=_write)
+    writer.daemon = True
+    writer.start()
+    try:
+        with client.makefile('rb') as lines:
+            for line in lines:
+                yield json.loads(line)
+    finally:
+        client.close()
+    writer.join()
+    if errors:
+        raise errors[0]
+
+
+def _load_requests(args):
+    if args.command == 'batch':
+        stream = open(args.file) if args.file else sys.stdin
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    elif args.command == 'bind':
+        with open(args.manifest) as f:
+            if args.manifest.lower().endswith(('.yaml', '.yml')):
+                import yaml
+                entries = yaml.safe_load(f)
+            else:
+                entries = json.load(f)
+        if isinstance(entries, dict):
+            entries = entries.get('connections')
+        for index, entry in enumerate(entries or []):
+            request = dict(entry, command='bind', id=index)
+            request.setdefault('resourceGroup', args.resource_group)
+            request['noWait'] = args.no_wait
+            yield request
+    elif args.command == 'validate':
+        for index, name in enumerate(args.name):
+            yield {'id': index, 'command': 'validate', 'resourceGroup': args.resource_group, 'name': name,
+                   'noWait': args.no_wait}
+    elif args.command == 'get':
+        yield {'id': 0, 'command': 'get', 'resourceGroup': args.resource_group, 'name': args.name,
+               'noCache': args.no_cache}
+    else:
+        yield {'id': 0, 'command': args.command}
+
+
+def main(argv=None):
+    # thin client of "az connect serve", which starts in a fraction of the time of az:
+    #     python ~/.azure/cliextensions/connect/azext_connect/_daemon.py validate -g rg -n connection1 connection2
+    parser = argparse.ArgumentParser(description='Send requests to a running "az connect serve".')
+    parser.add_argument('--socket', help='Socket of the daemon. Default: {0}'.format(get_socket_path()))
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+    bind = commands.add_parser('bind', help='Bind the connections of a batch-bind manifest')
+    bind.add_argument('--manifest', required=True)
+    bind.add_argument('--resource-group', '-g')
+    bind.add_argument('--no-wait', action='store_true')
+    validate = commands.add_parser('validate', help='Validate connections')
+    validate.add_argument('--resource-group', '-g', required=True)
+    validate.add_argument('--connection-name', '-n', dest='name', nargs='+', required=True)
+    validate.add_argument('--no-wait', action='store_true')
+    get = commands.add_parser('get', help='Get a connection')
+    get.add_argument('--resource-group', '-g', required=True)
+    get.add_argument('--connection-name', '-n', dest='name', required=True)
+    get.add_argument('--no-cache', action='store_true')
+    batch = commands.add_parser('batch', help='Send the JSON lines requests of a file or stdin')
+    batch.add_argument('file', nargs='?')
+    commands.add_parser('ping', help='Check that the daemon is running')
+    commands.add_parser('shutdown', help='Stop the daemon')
+    args = parser.parse_args(argv)
+
+    failed = False
+    try:
+        for response in send_requests(_load_requests(args), args.socket):
+            failed = failed or response.get('status') == 'Failed'
+            sys.stdout.write(json.dumps(response) + '\n')
+            sys.stdout.flush()
+    except Exception as e:  # pylint: disable=broad-except
+        sys.stderr.write('{0}\n'.format(e))
+        return 1
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
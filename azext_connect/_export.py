@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+
+EXPORT_FORMATS = ['env', 'json', 'appsettings']
+EXPORT_FILE_SUFFIXES = {
+    'env': '.env',
+    'json': '.json',
+    'appsettings': '.appsettings.json'
+}
+# hash and file of every exported connection, used to skip the unchanged ones on the next export
+EXPORT_STATE_FILE_NAME = '.connect-export.json'
+
+
+def make_setting_name(value):
+    return ''.join(c if c.isalnum() else '_' for c in value).upper()
+
+
+def get_connection_settings(connection):
+    # the settings of a connection: the configurations returned by the service, else derived from its properties
+    properties = connection.get('properties') or {}
+    configurations = properties.get('configurations')
+    if configurations:
+        return [(item['name'], item.get('value')) for item in configurations]
+    prefix = make_setting_name(connection['name'])
+    settings = [
+        ('{0}_SOURCE_ID'.format(prefix), properties.get('sourceId')),
+        ('{0}_TARGET_ID'.format(prefix), properties.get('targetId')),
+        ('{0}_AUTH_TYPE'.format(prefix), (properties.get('authInfo') or {}).get('authType'))
+    ]
+    for key, value in sorted((properties.get('additionalInfo') or {}).items()):
+        settings.append(('{0}_{1}'.format(prefix, make_setting_name(key)), value))
+    return [(name, value) for name, value in settings if value is not None]
+
+
+def get_connection_hash(connection):
+    return hashlib.sha256(json.dumps(connection, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _format_env_value(value):
+    value = str(value)
+    if value and all(c.isalnum() or c in '_-./:@,+=' for c in value):
+        return value
+    return '"{0}"'.format(value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+
+
+def format_settings(settings, export_format):
+    if export_format == 'env':
+        return ''.join('{0}={1}\n'.format(name, _format_env_value(value)) for name, value in settings)
+    if export_format == 'json':
+        return json.dumps(dict(settings), indent=2) + '\n'
+    # the format of "az webapp config appsettings set --settings @file"
+    return json.dumps([{'name': name, 'value': value, 'slotSetting': False} for name, value in settings], indent=2) + '\n'
+
+
+def get_export_file_name(connection_name, export_format):
+    safe_name = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in connection_name).lstrip('.')
+    return safe_name + EXPORT_FILE_SUFFIXES[export_format]
+
+
+def write_file(path, content):
+    # the settings may hold secrets, so the file is private, and readers never see a partial file
+    tmp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def load_state(output_dir):
+    try:
+        with open(os.path.join(output_dir, EXPORT_STATE_FILE_NAME)) as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def save_state(output_dir, state):
+    write_file(os.path.join(output_dir, EXPORT_STATE_FILE_NAME), json.dumps(state, indent=2, sort_keys=True))
@@ -38,12 +38,114 @@ helps['connect validate'] = """
     examples:
         - name: Validate the connection.
           text: az connect validate -n connectionname --resource-group rg
+        - name: Validate several connections concurrently.
+          text: az connect validate -n connection1 connection2 connection3 --resource-group rg
+        - name: Validate every connection in the resource group with at most 20 parallel requests.
+          text: az connect validate --resource-group rg --max-parallel 20
+        - name: Validate every connection in the resource group each minute and write a JSON line when one changes.
+          text: az connect validate --resource-group rg --watch --interval 60
 """
 
 helps['connect get'] = """
     type: command
     short-summary: Get the connection properties.
+    long-summary: |
+        Responses are cached locally. A cached response younger than 30 seconds is returned directly,
+        an older one is revalidated with the service and reused when the connection did not change.
     examples:
         - name: Get the connection properties.
           text: az connect get -name connectionname --resource-group rg
+        - name: Get the connection properties from the service, skipping the local cache.
+          text: az connect get -name connectionname --resource-group rg --no-cache
+        - name: Write the connection as returned by the service, without formatting it.
+          text: az connect get -name connectionname --resource-group rg --raw > connection.json
+"""
+
+helps['connect batch-bind'] = """
+    type: command
+    short-summary: Bind many connections described in a manifest file.
+    long-summary: |
+        The manifest is a JSON or YAML file with a list of connections, each with a name, an optional
+        resourceGroup, a source (type webapp, springcloud or function, app, springCloud, function, bindingType),
+        a target (sql, mysql, postgres, cosmos, signalR or keyvault, and database) and an auth section
+        (type, permission, clientId, clientSecret, username, password). The result of every entry is reported
+        and a failed entry does not stop the others.
+    examples:
+        - name: Bind the connections in a manifest with at most 20 parallel requests.
+          text: az connect batch-bind --manifest connections.yaml --resource-group rg --max-parallel 20
+        - name: Find the apps and targets named in the manifest in any resource group with one query before binding.
+          text: az connect batch-bind --manifest connections.yaml --resource-group rg --resolve-names
+"""
+
+helps['connect wait'] = """
+    type: command
+    short-summary: Wait for operations started with --no-wait to finish.
+    long-summary: |
+        Bind and validate commands run with --no-wait return an operation handle when the service accepts the
+        request as a long-running operation. Pass one or more handles to poll them until they finish.
+    examples:
+        - name: Wait for the operations of two binds started with --no-wait.
+          text: az connect wait --operation <operation-handle-1> <operation-handle-2>
+"""
+
+helps['connect list'] = """
+    type: command
+    short-summary: List the connections of a resource group or subscription.
+    long-summary: Connections are written page by page as they arrive, so the output starts before the listing ends.
+    examples:
+        - name: List the connections in a resource group.
+          text: az connect list --resource-group rg
+        - name: Stream every connection in the subscription as newline-delimited JSON.
+          text: az connect list --ndjson > connections.ndjson
+"""
+
+helps['connect apply'] = """
+    type: command
+    short-summary: Make the connections match the ones described in a manifest file.
+    long-summary: |
+        The manifest has the format of batch-bind. The current state of every connection is read first and its
+        sourceId, targetId, authInfo and additionalInfo are compared with the manifest. Only missing connections
+        and connections which differ are written, the others are reported as unchanged. Secrets are never
+        returned by the service and are not compared, so a changed password alone does not update a connection;
+        use batch-bind to rewrite it.
+    examples:
+        - name: Show what would change without changing anything.
+          text: az connect apply --manifest connections.yaml --resource-group rg --plan
+        - name: Create or update the connections which differ from the manifest.
+          text: az connect apply --manifest connections.yaml --resource-group rg
+        - name: Check that the resources named in the manifest exist before planning the changes.
+          text: az connect apply --manifest connections.yaml --resource-group rg --resolve-names --plan
+"""
+
+helps['connect serve'] = """
+    type: command
+    short-summary: Keep a local daemon running which binds, validates and gets connections without starting az.
+    long-summary: |
+        The daemon listens on a Unix socket that only the current user can open. It handles JSON lines
+        requests with the clients, tokens and caches of one warm process, for the subscription it was started
+        with. Send it requests with the thin client, the script _daemon.py of the extension, which needs only
+        Python and starts much faster than az. The daemon prints its path when it starts, by default
+        ~/.azure/cliextensions/connect/azext_connect/_daemon.py. Bind requests take the entries of a batch-bind
+        manifest. The daemon stops on Ctrl+C, SIGTERM or a shutdown request.
+    examples:
+        - name: Start the daemon with at most 20 requests handled at the same time.
+          text: az connect serve --max-parallel 20
+        - name: Bind the connections of a manifest through the running daemon.
+          text: python ~/.azure/cliextensions/connect/azext_connect/_daemon.py bind --manifest connections.json -g rg
+        - name: Validate connections through the running daemon.
+          text: python ~/.azure/cliextensions/connect/azext_connect/_daemon.py validate -g rg -n connection1 connection2
+"""
+
+helps['connect export'] = """
+    type: command
+    short-summary: Write the settings of connections to one .env, JSON or app-settings file per connection.
+    long-summary: |
+        The connections are read concurrently and every file is written as soon as its connection arrives.
+        The output directory remembers what was exported, so a later export only rewrites the files of the
+        connections which changed, and removes the files of the connections deleted from the resource group.
+    examples:
+        - name: Export every connection in the resource group as .env files.
+          text: az connect export --resource-group rg --output-dir settings
+        - name: Export two connections in the format of "az webapp config appsettings set".
+          text: az connect export --resource-group rg -n connection1 connection2 --output-dir settings --format appsettings
 """
@@ -0,0 +1,70 @@
+import json
+import os
+
+JSON_BACKEND_ENV = 'CONNECT_JSON_BACKEND'
+JSON_BACKENDS = ['orjson', 'ujson', 'json']
+
+_backend = None
+
+
+def _stdlib_backend():
+    return (
+        'json',
+        json.loads,
+        lambda obj: json.dumps(obj).encode('utf-8'),
+        lambda obj: json.dumps(obj, indent=2)
+    )
+
+
+def _load_backend(name):
+    if name == 'orjson':
+        import orjson
+        return (
+            name,
+            orjson.loads,
+            orjson.dumps,
+            lambda obj: orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+        )
+    if name == 'ujson':
+        import ujson
+        return (
+            name,
+            ujson.loads,
+            lambda obj: ujson.dumps(obj, ensure_ascii=False).encode('utf-8'),
+            lambda obj: ujson.dumps(obj, indent=2, ensure_ascii=False)
+        )
+    if name == 'json':
+        return _stdlib_backend()
+    raise ImportError('Unknown JSON backend {0}'.format(name))
+
+
+def get_backend():
+    # (name, loads, dumps, dumps_pretty) of the fastest installed backend, which is only imported by the
+    # commands which use it. CONNECT_JSON_BACKEND names the backend to use instead, e.g. json for the standard library.
+    global _backend  # pylint: disable=global-statement
+    if _backend is None:
+        names = [os.environ[JSON_BACKEND_ENV]] if os.environ.get(JSON_BACKEND_ENV) else JSON_BACKENDS
+        backend = None
+        for name in names:
+            try:
+                backend = _load_backend(name)
+                break
+            except ImportError:
+                continue
+        _backend = backend or _stdlib_backend()
+    return _backend
+
+
+def loads(data):
+    # data is the raw body, bytes are decoded by the backend without making a text copy first
+    return get_backend()[1](data)
+
+
+def dumps(obj):
+    # compact UTF-8 bytes, as sent to the service
+    return get_backend()[2](obj)
+
+
+def dumps_pretty(obj):
+    # text indented by two spaces, as printed by the commands
+    return get_backend()[3](obj)
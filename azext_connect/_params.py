@@ -1,7 +1,5 @@
 from knack.arguments import CLIArgumentType
-from azure.cli.core.commands.parameters import (resource_group_name_type, get_location_type,
-                                                get_resource_name_completion_list, file_type,
-                                                get_three_state_flag, get_enum_type, tags_type)
+from azure.cli.core.commands.parameters import resource_group_name_type, get_enum_type
 from azure.cli.core.local_context import LocalContextAction, LocalContextAttribute
 from ._model import AuthType
 
@@ -19,6 +17,10 @@ def load_arguments(self, _):
     postgres_database_username_argument_type = CLIArgumentType(options_list=['--user-name', '-user'],
                                                                help="User name of the database. Only valid when auth type is secret",
                                                                local_context_attribute=LocalContextAttribute(name='postgres_admin_user_name', actions=[LocalContextAction.GET]))
+    with self.argument_context('connect') as c:
+        c.argument('timings', options_list=['--timings'], action='store_true',
+                   help='Print how long every phase of the command took to stderr when it finishes')
+
     with self.argument_context('connect webapp') as c:
         c.argument('resource_group', options_list=['--resource-group', '-g'], help='Resource group to provision services.')
         c.argument('name', options_list=['--connection-name', '-n'], help='Connection name')
@@ -38,6 +40,8 @@ def load_arguments(self, _):
         c.argument('username', options_list=['--user-name', '-user'], help='User name of the database. Only valid when auth type is secret')
         c.argument('password', options_list=['--password', '-pwd'], help='Password of the database. Only valid when auth type is secret')
         c.argument('keyvault', options_list=['--keyvault', '-kvt'], help='Keyvault name in the same resource group.')
+        c.argument('refresh', options_list=['--refresh'], action='store_true',
+                   help='Look up the CosmosDB database type again instead of using the cached one')
 
     with self.argument_context('connect webapp postgres') as c:
         c.argument('resource_group', arg_type=resource_group_name_type)
@@ -64,6 +68,8 @@ def load_arguments(self, _):
         c.argument('database', options_list=['--database-name', '-db'], help='Database name')
         c.argument('username', options_list=['--user-name', '-user'], help='User name of the database. Only valid when auth type is secret')
         c.argument('password', options_list=['--password', '-pwd'], help='Password of the database. Only valid when auth type is secret')
+        c.argument('refresh', options_list=['--refresh'], action='store_true',
+                   help='Look up the CosmosDB database type again instead of using the cached one')
 
     with self.argument_context('connect function') as c:
         c.argument('resource_group', options_list=['--resource-group', '-g'], help='Resource group to provision services.')
@@ -75,8 +81,79 @@ def load_arguments(self, _):
 
     with self.argument_context('connect validate') as c:
         c.argument('resource_group', arg_type=resource_group_name_type)
-        c.argument('name', options_list=['--connection-name', '-n'], help='Connection name')
+        c.argument('name', options_list=['--connection-name', '-n'], nargs='+',
+                   help='Space-separated connection names. Validate every connection in the resource group if omitted')
+        c.argument('max_parallel', options_list=['--max-parallel'], type=int,
+                   help='Maximum number of connections validated at the same time')
+        c.argument('raw_output', options_list=['--raw'], action='store_true',
+                   help='Write the response body of the service as received. Only valid for a single connection')
+        c.argument('watch', options_list=['--watch'], action='store_true',
+                   help='Validate again every --interval seconds until interrupted and only write the connections '
+                        'whose validation state changed. A cycle that fails to list the connections is retried on '
+                        'the next one')
+        c.argument('interval', options_list=['--interval'], type=int,
+                   help='Seconds between the validations of --watch')
+
+    with self.argument_context('connect serve') as c:
+        c.argument('socket_path', options_list=['--socket'],
+                   help='Unix socket to listen on. Default: connect/daemon.sock in the azure-cli config directory')
+        c.argument('max_parallel', options_list=['--max-parallel'], type=int,
+                   help='Maximum number of requests handled at the same time')
+
+    with self.argument_context('connect export') as c:
+        c.argument('resource_group', arg_type=resource_group_name_type)
+        c.argument('output_dir', options_list=['--output-dir'], help='Directory to write one settings file per connection to')
+        c.argument('name', options_list=['--connection-name', '-n'], nargs='+',
+                   help='Space-separated connection names. Export every connection in the resource group if omitted')
+        c.argument('export_format', options_list=['--format'], arg_type=get_enum_type(['env', 'json', 'appsettings']),
+                   help='File format: .env lines, a JSON object or the JSON array of "az webapp config appsettings set"')
+        c.argument('max_parallel', options_list=['--max-parallel'], type=int,
+                   help='Maximum number of connections read at the same time')
+        c.argument('force', options_list=['--force'], action='store_true',
+                   help='Write the files of the connections which did not change since the previous export too')
 
     with self.argument_context('connect get') as c:
         c.argument('resource_group', arg_type=resource_group_name_type)
         c.argument('name', options_list=['--connection-name', '-n'], help='Connection name')
+        c.argument('no_cache', options_list=['--no-cache'], action='store_true',
+                   help='Get the connection from the service instead of the local response cache')
+        c.argument('raw_output', options_list=['--raw'], action='store_true',
+                   help='Write the response body of the service as received')
+
+    with self.argument_context('connect batch-bind') as c:
+        c.argument('manifest', options_list=['--manifest', '-m'], help='JSON or YAML file listing the connections to bind')
+        c.argument('resource_group', options_list=['--resource-group', '-g'],
+                   help='Default resource group for the connections which do not set resourceGroup')
+        c.argument('max_parallel', options_list=['--max-parallel'], type=int,
+                   help='Maximum number of connections bound at the same time')
+        c.argument('refresh', options_list=['--refresh'], action='store_true',
+                   help='Look up the CosmosDB database types again instead of using the cached ones')
+        c.argument('resolve_names', options_list=['--resolve-names'], action='store_true',
+                   help='Find the apps and targets given by name with one Resource Graph query, in any resource group '
+                        'of the subscription, and fail the entries whose resources do not exist')
+
+    with self.argument_context('connect wait') as c:
+        c.argument('operation', options_list=['--operation'], nargs='+',
+                   help='Space-separated operation handles returned by a command run with --no-wait')
+        c.argument('max_parallel', options_list=['--max-parallel'], type=int,
+                   help='Maximum number of operations polled at the same time')
+
+    with self.argument_context('connect list') as c:
+        c.argument('resource_group', options_list=['--resource-group', '-g'],
+                   help='Resource group of the connections. List the connections of the whole subscription if omitted')
+        c.argument('ndjson', options_list=['--ndjson'], action='store_true',
+                   help='Write one JSON document per line instead of a JSON array')
+
+    with self.argument_context('connect apply') as c:
+        c.argument('manifest', options_list=['--manifest', '-m'], help='JSON or YAML file describing the desired connections')
+        c.argument('resource_group', options_list=['--resource-group', '-g'],
+                   help='Default resource group for the connections which do not set resourceGroup')
+        c.argument('max_parallel', options_list=['--max-parallel'], type=int,
+                   help='Maximum number of connections read or written at the same time')
+        c.argument('refresh', options_list=['--refresh'], action='store_true',
+                   help='Look up the CosmosDB database types again instead of using the cached ones')
+        c.argument('plan', options_list=['--plan'], action='store_true',
+                   help='Print the changes which would be made without making them')
+        c.argument('resolve_names', options_list=['--resolve-names'], action='store_true',
+                   help='Find the apps and targets given by name with one Resource Graph query, in any resource group '
+                        'of the subscription, and fail the entries whose resources do not exist')
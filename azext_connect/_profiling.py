@@ -0,0 +1,103 @@
+import atexit
+import os
+import sys
+import threading
+import time
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+PROFILE_DIR_ENV = 'CONNECT_PROFILE_DIR'
+PROFILE_TOP_ENV = 'CONNECT_PROFILE_TOP'
+DEFAULT_TOP = 50
+TRACEMALLOC_FRAMES = 10
+
+_profiles = []
+_profiles_lock = threading.Lock()
+_started = False
+
+
+def _is_connect_command(argv):
+    args = [arg for arg in argv if not arg.startswith('-')]
+    return bool(args) and args[0] == 'connect'
+
+
+def _new_profile():
+    import cProfile
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Python 3.12+ allows a single profiler, which then sees every thread
+        return
+    with _profiles_lock:
+        _profiles.append(profile)
+
+
+def _profile_thread(frame, event, arg):  # pylint: disable=unused-argument
+    # installed with threading.setprofile, replaced by the profiler of the new thread on its first call
+    sys.setprofile(None)
+    _new_profile()
+
+
+def start_profiling(argv=None):
+    # With CONNECT_PROFILE_DIR set, profile the running connect command from the extension load to the
+    # process exit, including the time spent in the CLI framework, then write a pstats dump and the top
+    # tracemalloc allocations to that directory.
+    global _started  # pylint: disable=global-statement
+    directory = os.environ.get(PROFILE_DIR_ENV)
+    if _started or not directory or not _is_connect_command(sys.argv[1:] if argv is None else argv):
+        return False
+    _started = True
+    import tracemalloc
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    threading.setprofile(_profile_thread)
+    _new_profile()
+    atexit.register(_dump, directory)
+    return True
+
+
+def _dump(directory):
+    import tracemalloc
+    # stop measuring before writing the reports so they do not show up in them
+    threading.setprofile(None)
+    with _profiles_lock:
+        profiles = list(_profiles)
+    for profile in profiles:
+        profile.disable()
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    import pstats
+    if not profiles:
+        logger.warning('The command was not profiled, another profiler is active')
+        return
+    try:
+        top = int(os.environ.get(PROFILE_TOP_ENV) or DEFAULT_TOP)
+    except ValueError:
+        top = DEFAULT_TOP
+    prefix = os.path.join(directory, 'connect-{0}-{1}'.format(time.strftime('%Y%m%d-%H%M%S'), os.getpid()))
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # one profile per thread, merged so worker threads of the bulk commands are included
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(prefix + '.pstats')
+        with open(prefix + '-cpu.txt', 'w') as f:
+            pstats.Stats(prefix + '.pstats', stream=f).sort_stats('cumulative').print_stats(top)
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>')
+        ])
+        with open(prefix + '-memory.txt', 'w') as f:
+            f.write('Peak traced memory: {0:.1f} KiB\n\n'.format(peak / 1024.0))
+            for statistic in snapshot.statistics('traceback')[:top]:
+                f.write('{0}\n'.format(statistic))
+                for line in statistic.traceback.format():
+                    f.write('{0}\n'.format(line))
+                f.write('\n')
+    except (IOError, OSError) as e:
+        logger.warning('Fail to write the profile to %s: %s', directory, e)
+        return
+    sys.stderr.write('Profile written to {0}.pstats, {0}-cpu.txt and {0}-memory.txt\n'.format(prefix))
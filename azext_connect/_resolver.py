@@ -0,0 +1,143 @@
+import importlib
+import json
+import os
+from ._resource_id import ResourceId
+from ._timing import span
+
+RESOLVER_BACKEND_ENV = 'CONNECT_RESOLVER_BACKEND'
+RESOURCE_GRAPH_URI = '{0}/providers/Microsoft.ResourceGraph/resources?api-version=2021-03-01'
+RESOURCE_GRAPH_PAGE_SIZE = 1000
+# names per query, which keeps the query text within the limits of Resource Graph
+RESOURCE_GRAPH_MAX_NAMES = 1000
+
+
+def _quote(value):
+    # KQL string literal
+    return "'{0}'".format(value.replace('\\', '\\\\').replace("'", "\\'"))
+
+
+class ResourceGraphBackend(object):
+    # Finds resources by type and name with Azure Resource Graph queries, sent with the credentials of the command.
+    # A query covers up to RESOURCE_GRAPH_MAX_NAMES names of every type, whatever resource group they are in.
+
+    def __init__(self, cmd):
+        self._cmd = cmd
+
+    def _build_query(self, names_by_type):
+        conditions = ['(type =~ {0} and name in~ ({1}))'.format(_quote(resource_type), ', '.join(_quote(name) for name in names))
+                      for resource_type, names in sorted(names_by_type.items())]
+        return 'Resources | where {0} | project id, name, type, kind, capabilities = properties.capabilities'.format(
+            ' or '.join(conditions))
+
+    def _send(self, subscription, query):
+        from azure.cli.core.util import send_raw_request
+        uri = RESOURCE_GRAPH_URI.format(self._cmd.cli_ctx.cloud.endpoints.resource_manager.rstrip('/'))
+        records = []
+        skip_token = None
+        while True:
+            options = {'$top': RESOURCE_GRAPH_PAGE_SIZE, 'resultFormat': 'objectArray'}
+            if skip_token:
+                options['$skipToken'] = skip_token
+            body = {'subscriptions': [subscription], 'query': query, 'options': options}
+            res = send_raw_request(self._cmd.cli_ctx, 'POST', uri, body=json.dumps(body))
+            page = res.json()
+            records.extend(page.get('data') or [])
+            skip_token = page.get('$skipToken')
+            if not skip_token:
+                return records
+
+    def query(self, subscription, names_by_type):
+        records = []
+        chunk = {}
+        count = 0
+        for resource_type, names in sorted(names_by_type.items()):
+            for name in sorted(names):
+                chunk.setdefault(resource_type, []).append(name)
+                count += 1
+                if count == RESOURCE_GRAPH_MAX_NAMES:
+                    records.extend(self._send(subscription, self._build_query(chunk)))
+                    chunk, count = {}, 0
+        if chunk:
+            records.extend(self._send(subscription, self._build_query(chunk)))
+        return records
+
+
+class StaticBackend(object):
+    # Answers the queries from a fixed list of resources, e.g. for tests or offline runs. A record has the
+    # id, name, type and, for CosmosDB accounts, kind and capabilities of a resource, as Resource Graph returns them.
+
+    def __init__(self, records):
+        self._records = list(records)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def query(self, subscription, names_by_type):
+        prefix = '/subscriptions/{0}/'.format(subscription).lower()
+        return [record for record in self._records if record['id'].lower().startswith(prefix) and
+                record['name'].lower() in names_by_type.get(record['type'].lower(), ())]
+
+
+def get_backend(cmd):
+    # CONNECT_RESOLVER_BACKEND is a JSON file of resources served by a StaticBackend, or package.module:function
+    # returning the backend for the command. Resource Graph is used otherwise.
+    value = os.environ.get(RESOLVER_BACKEND_ENV)
+    if not value:
+        return ResourceGraphBackend(cmd)
+    if value.lower().endswith('.json'):
+        return StaticBackend.load(value)
+    module_name, _, func_name = value.partition(':')
+    try:
+        factory = getattr(importlib.import_module(module_name), func_name)
+    except (ImportError, AttributeError) as e:
+        raise Exception('Fail to load the resolver backend {0}. Detail:{1}'.format(value, e))
+    return factory(cmd)
+
+
+class ResourceIndex(object):
+    # Resources found by one query, by type and name, so every lookup of a manifest is a dict read
+
+    def __init__(self, records=()):
+        self._by_name = {}
+        self._by_id = {}
+        for record in records:
+            self.add(record)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def add(self, record):
+        # Resource Graph returns well formed IDs
+        resource_id = ResourceId(record['id'])
+        self._by_name.setdefault((record['type'].lower(), record['name'].lower()), []).append(resource_id)
+        self._by_id[str(resource_id).lower()] = record
+
+    def get(self, resource_id):
+        # the record of a resource ID, or None when the query did not return it
+        return self._by_id.get(str(resource_id).lower())
+
+    def find(self, resource_group, namespace, resource_type, name):
+        # the resource in resource_group, or else the only one of that name in the subscription
+        full_type = '{0}/{1}'.format(namespace, resource_type)
+        matches = self._by_name.get((full_type.lower(), name.lower()))
+        if not matches:
+            raise Exception('{0} {1} was not found in the subscription'.format(full_type, name))
+        for resource_id in matches:
+            if resource_id.resource_group.lower() == resource_group.lower():
+                return resource_id
+        if len(matches) > 1:
+            raise Exception('{0} {1} is in the resource groups {2}, use its resource ID instead'.format(
+                full_type, name, ', '.join(sorted(resource_id.resource_group for resource_id in matches))))
+        return matches[0]
+
+
+def build_index(backend, subscription, names_by_type):
+    # one round of queries for every name, however many entries refer to them
+    names_by_type = {resource_type.lower(): set(name.lower() for name in names)
+                     for resource_type, names in names_by_type.items() if names}
+    with span('resolve.query', names=sum(len(names) for names in names_by_type.values())) as query_span:
+        index = ResourceIndex(backend.query(subscription, names_by_type) if names_by_type else [])
+        query_span.attributes['resources'] = len(index)
+    return index
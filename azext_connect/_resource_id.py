@@ -0,0 +1,104 @@
+import re
+
+# /subscriptions/{subscription}[/resourceGroups/{resource_group}[/providers/{namespace}/{type}/{name}...]]
+_RESOURCE_ID = re.compile(r'/(?i:subscriptions)/[^/]+(?:/(?i:resourceGroups)/[^/]+'
+                          r'(?:/(?i:providers)/[^/]+(?:/[^/]+/[^/]+)+)?)?/?')
+
+
+class ResourceId(object):
+    # Immutable ARM resource ID: /subscriptions/{subscription}/resourceGroups/{resource_group}
+    # /providers/{namespace}/{type}/{name}[/{child type}/{child name}...]. Only the string is stored, it is
+    # split the first time one of its parts is read.
+    __slots__ = ('_value', '_parts')
+
+    def __init__(self, value):
+        # value is a well formed ID, e.g. one returned by the service, use parse for one given by the user
+        self._value = value
+        self._parts = None
+
+    @classmethod
+    def from_parts(cls, subscription, resource_group=None, namespace=None, segments=()):
+        if resource_group:
+            value = '/subscriptions/{0}/resourceGroups/{1}'.format(subscription, resource_group)
+        else:
+            value = '/subscriptions/{0}'.format(subscription)
+        if namespace:
+            value = '/'.join((value, 'providers', namespace) + tuple(segments))
+        return cls(value)
+
+    @classmethod
+    def parse(cls, value):
+        if _RESOURCE_ID.fullmatch(value) is None:
+            raise Exception('{0} is not a valid resource ID'.format(value))
+        return cls(value[:-1] if value[-1] == '/' else value)
+
+    @staticmethod
+    def is_resource_id(value):
+        return value.lower().startswith('/subscriptions/')
+
+    def _split(self):
+        parts = self._parts
+        if parts is None:
+            parts = self._parts = self._value.split('/')
+        return parts
+
+    @property
+    def subscription(self):
+        return self._split()[2]
+
+    @property
+    def resource_group(self):
+        parts = self._split()
+        return parts[4] if len(parts) > 3 else None
+
+    @property
+    def namespace(self):
+        parts = self._split()
+        return parts[6] if len(parts) > 5 else None
+
+    @property
+    def segments(self):
+        # alternating types and names of the resource and its children
+        return tuple(self._split()[7:])
+
+    @property
+    def resource_type(self):
+        parts = self._split()
+        return parts[7] if len(parts) > 7 else None
+
+    @property
+    def resource_name(self):
+        # name of the top level resource, e.g. the server of a database
+        parts = self._split()
+        return parts[8] if len(parts) > 8 else None
+
+    @property
+    def name(self):
+        return self._split()[-1]
+
+    def resource(self, namespace, resource_type, name):
+        # resource of the resource group this ID is or belongs to
+        if self._value.count('/') <= 4:
+            scope = self._value
+        else:
+            scope = '/subscriptions/{0}/resourceGroups/{1}'.format(self.subscription, self.resource_group)
+        return ResourceId('{0}/providers/{1}/{2}/{3}'.format(scope, namespace, resource_type, name))
+
+    def child(self, resource_type, name):
+        return ResourceId('{0}/{1}/{2}'.format(self._value, resource_type, name))
+
+    def __str__(self):
+        return self._value
+
+    def __repr__(self):
+        return 'ResourceId({0!r})'.format(self._value)
+
+    def __eq__(self, other):
+        # resource IDs are case insensitive
+        return isinstance(other, ResourceId) and self._value.lower() == other._value.lower()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._value.lower())
@@ -0,0 +1,153 @@
+import atexit
+import importlib
+import os
+import sys
+import threading
+import time
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+SPAN_HOOK_ENV = 'CONNECT_SPAN_HOOK'
+
+_hooks = []
+_hooks_loaded = False
+_spans = []
+_lock = threading.Lock()
+_recording = False
+_started = None
+
+
+class Span(object):
+    # One timed phase of a command. Fields such as the status code of a request are added to attributes
+    # while the span is open.
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.thread = threading.current_thread().name
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+        self._counter = time.perf_counter()
+
+    def finish(self, error=None):
+        self.duration = time.perf_counter() - self._counter
+        self.error = error
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'start': self.start,
+            'durationMs': round(self.duration * 1000, 3),
+            'thread': self.thread,
+            'error': str(self.error) if self.error else None,
+            'attributes': self.attributes
+        }
+
+
+def register_span_hook(hook):
+    # hook(span) is called with every finished span, e.g. to forward it to a tracing backend
+    with _lock:
+        if hook not in _hooks:
+            _hooks.append(hook)
+
+
+def unregister_span_hook(hook):
+    with _lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+def _load_env_hook():
+    # CONNECT_SPAN_HOOK=package.module:function registers a hook without changing the extension
+    global _hooks_loaded  # pylint: disable=global-statement
+    _hooks_loaded = True
+    value = os.environ.get(SPAN_HOOK_ENV)
+    if not value:
+        return
+    module_name, _, func_name = value.partition(':')
+    try:
+        hook = getattr(importlib.import_module(module_name), func_name or 'on_span')
+    except (ImportError, AttributeError) as e:
+        logger.warning('Fail to load the span hook %s: %s', value, e)
+        return
+    register_span_hook(hook)
+
+
+class span(object):  # pylint: disable=invalid-name
+    # with span('http.request', method='GET') as s: ... times the block and hands it to the recorder and hooks
+
+    def __init__(self, name, **attributes):
+        self._name = name
+        self._attributes = attributes
+        self._span = None
+
+    def __enter__(self):
+        self._span = Span(self._name, self._attributes)
+        return self._span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._span.finish(exc_value)
+        _emit(self._span)
+        return False
+
+
+def _emit(finished):
+    if not _hooks_loaded:
+        _load_env_hook()
+    if _recording:
+        with _lock:
+            _spans.append(finished)
+    for hook in list(_hooks):
+        try:
+            hook(finished)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.debug('Span hook %s failed: %s', hook, e)
+
+
+def get_spans():
+    with _lock:
+        return list(_spans)
+
+
+def start_recording(report=True):
+    # keep the spans of this process, and with report print the breakdown to stderr when it exits,
+    # also after a command ends with sys.exit
+    global _recording, _started  # pylint: disable=global-statement
+    if _recording:
+        return
+    _recording = True
+    _started = time.perf_counter()
+    if report:
+        atexit.register(_report)
+
+
+def format_report(spans, total=None):
+    lines = []
+    if total is not None:
+        lines.append('Total: {0:.1f} ms'.format(total * 1000))
+    phases = {}
+    for item in spans:
+        count, elapsed, longest = phases.get(item.name, (0, 0.0, 0.0))
+        phases[item.name] = (count + 1, elapsed + item.duration, max(longest, item.duration))
+    lines.append('{0:<32} {1:>6} {2:>11} {3:>11}'.format('Phase', 'Count', 'Total ms', 'Max ms'))
+    for name, (count, elapsed, longest) in sorted(phases.items(), key=lambda item: -item[1][1]):
+        lines.append('{0:<32} {1:>6} {2:>11.1f} {3:>11.1f}'.format(name, count, elapsed * 1000, longest * 1000))
+    requests = [item for item in spans if item.name == 'http.request']
+    if requests:
+        lines.append('')
+        lines.append('{0:<7} {1:>6} {2:>10} {3:>10} {4:>7} {5:>11}  {6}'.format(
+            'Method', 'Status', 'Sent', 'Received', 'Retries', 'ms', 'URL'))
+        for item in requests:
+            attributes = item.attributes
+            lines.append('{0:<7} {1:>6} {2:>10} {3:>10} {4:>7} {5:>11.1f}  {6}'.format(
+                attributes.get('method'), attributes.get('status_code') or '-', attributes.get('bytes_sent', 0),
+                attributes.get('bytes_received', 0), attributes.get('retries', 0), item.duration * 1000,
+                attributes.get('url')))
+    return '\n'.join(lines)
+
+
+def _report():
+    total = time.perf_counter() - _started if _started is not None else None
+    sys.stderr.write(format_report(get_spans(), total) + '\n')
+    sys.stderr.flush()
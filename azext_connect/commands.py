@@ -1,13 +1,25 @@
 def load_command_table(self, _):
     with self.command_group('connect webapp') as g:
-        g.custom_command('bind', 'bind_webapp')
+        g.custom_command('bind', 'bind_webapp', supports_no_wait=True)
     with self.command_group('connect webapp postgres') as g:
         g.custom_command('bind', 'bind_webapp_postgres')
     with self.command_group('connect springcloud') as g:
-        g.custom_command('bind', 'bind_springcloud')
+        g.custom_command('bind', 'bind_springcloud', supports_no_wait=True)
     with self.command_group('connect function') as g:
-        g.custom_command('bind', 'bind_function')
+        g.custom_command('bind', 'bind_function', supports_no_wait=True)
     with self.command_group('connect') as g:
-        g.custom_command('validate', 'validate_general')
+        g.custom_command('validate', 'validate_general', supports_no_wait=True)
     with self.command_group('connect') as g:
         g.custom_command('get', 'get_general')
+    with self.command_group('connect') as g:
+        g.custom_command('batch-bind', 'batch_bind', supports_no_wait=True)
+    with self.command_group('connect') as g:
+        g.custom_command('wait', 'wait_general')
+    with self.command_group('connect') as g:
+        g.custom_command('list', 'list_general')
+    with self.command_group('connect') as g:
+        g.custom_command('apply', 'apply_general', supports_no_wait=True)
+    with self.command_group('connect') as g:
+        g.custom_command('serve', 'serve_general')
+    with self.command_group('connect') as g:
+        g.custom_command('export', 'export_general')
@@ -3,56 +3,101 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 import json
+import os
 import random
 import time
 import sys
-import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from knack.log import get_logger
 from knack.util import CLIError
-from azure.cli.command_modules.profile.custom import get_access_token
-from azure.cli.core import get_default_cli
 from azure.cli.core.commands.client_factory import get_subscription_id
-from knack.prompting import prompt, prompt_pass, prompt_choice_list
-from ._apis import CupertinoApi
+from ._cache import FileCache, ResponseCache, TokenCache
+from ._json import dumps, dumps_pretty, loads
 from ._model import AuthType, AuthInfo
+from ._resource_id import ResourceId
+from ._timing import span, start_recording
 
 logger = get_logger(__name__)
 COSMOSDB_KIND = ['GlobalDocumentDB', 'MongoDB', 'Parse']
 COSMOS_CAPABILITES = ['EnableCassandra', 'EnableTable', 'EnableGremlin']
 COSMOS_DATABASE_TYPE = ['cassandraKeyspaces', 'tables', 'gremlinDatabases', 'sqlDatabases', 'mongodbDatabases']
+# extra tokens sent besides the ARM token, with the get_access_token arguments to fetch them
+TOKEN_TYPES = [
+    ('graph', {'resource': 'https://graph.windows.net/'}),
+    ('sql', {'resource': 'https://database.windows.net'}),
+    ('oss-rdbms', {'resource_type': 'oss-rdbms'})
+]
+ALL_TOKEN_TYPES = [token_type for token_type, _ in TOKEN_TYPES]
+SQL_PROVIDER = '/providers/microsoft.sql/'
+RDBMS_PROVIDERS = ['/providers/microsoft.dbformysql/', '/providers/microsoft.dbforpostgresql/']
+SOURCE_TYPES = ['webapp', 'springcloud', 'function']
+TARGET_KEYS = ['sql', 'mysql', 'postgres', 'cosmos', 'database', 'signalR', 'keyvault']
+# namespace and type of the resource named by each target argument
+TARGET_TYPES = {
+    'sql': ('Microsoft.Sql', 'servers'),
+    'mysql': ('Microsoft.DBforMySQL', 'servers'),
+    'postgres': ('Microsoft.DBforPostgreSQL', 'servers'),
+    'cosmos': ('Microsoft.DocumentDb', 'databaseAccounts'),
+    'signalR': ('Microsoft.SignalRService', 'signalR'),
+    'keyvault': ('Microsoft.KeyVault', 'vaults')
+}
+DEFAULT_MAX_PARALLEL = 10
+COSMOS_DATABASE_TYPE_TTL = 7 * 24 * 60 * 60
+RESPONSE_CACHE_MAX_AGE = 30
+RESPONSE_CACHE_MAX_ENTRIES = 500
+RESPONSE_CACHE_TTL = 24 * 60 * 60
+DEFAULT_WATCH_INTERVAL = 60
+# fetch new tokens this long before they expire
+TOKEN_REFRESH_SKEW = 5 * 60
+TOKEN_CACHE_TTL = 24 * 60 * 60
+# connection properties compared by apply, which are the ones a create sends
+APPLY_PROPERTIES = ['sourceId', 'targetId', 'authInfo', 'additionalInfo']
+# sent on create but never returned by the service, so apply can not tell whether they changed
+WRITE_ONLY_PROPERTIES = ['secret']
 
+# database types keyed by the lower case CosmosDB account ID
+_cosmos_database_types = FileCache('cosmos_database_types.json', COSMOS_DATABASE_TYPE_TTL)
+# connection GET responses keyed by the connection resource URI
+_connection_responses = ResponseCache(
+    'connection_responses.json', RESPONSE_CACHE_MAX_AGE, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL
+)
+# access tokens keyed by the tenant, subscription, user and resource
+_access_tokens = TokenCache('access_tokens.json', TOKEN_REFRESH_SKEW, TOKEN_CACHE_TTL)
 
-def _is_resourcid(resource):
-    return resource.startswith('/subscriptions/')
 
+def _get_cosmos_database_type(cmd, cosmos_id, refresh=False):
+    key = cosmos_id.lower()
+    with span('resolve.cosmos_database_type', cosmos_id=cosmos_id) as lookup_span:
+        database_type = None if refresh else _cosmos_database_types.get(key)
+        lookup_span.attributes['cached'] = database_type is not None
+        if database_type is None:
+            database_type = _show_cosmos_database_type(cmd, cosmos_id)
+            _cosmos_database_types.set(key, database_type)
+    return database_type
 
-def _get_rg_from_scope(scope):
-    if scope.startswith('/subscriptions'):
-        match = re.search(r"\/resourceGroups\/[^\/]+", scope)
-        if (match):
-            return match.group().split("/")[2]
-    raise Exception('Can not get resource group from {0}'.format(scope))
+
+def _show_cosmos_database_type(cmd, cosmos_id):
+    # call the management API with the credentials of the running command instead of a nested "az cosmosdb show"
+    from azure.cli.core.commands.client_factory import get_mgmt_service_client
+    from azure.mgmt.cosmosdb import CosmosDBManagementClient
+    account_id = ResourceId.parse(cosmos_id)
+    client = get_mgmt_service_client(cmd.cli_ctx, CosmosDBManagementClient, subscription_id=account_id.subscription)
+    try:
+        account = client.database_accounts.get(account_id.resource_group, account_id.resource_name)
+    except Exception as e:
+        raise CLIError('Fail to show CosmosDb account {0} info. Detail:{1}'.format(account_id.resource_name, e))
+    return _get_cosmos_database_type_of(account.kind, [item.name for item in account.capabilities or []])
 
 
-def _get_cosmos_database_type(resource_group, cosmos_account):
-    cli = get_default_cli()
-    parameters = [
-        'cosmosdb', 'show',
-        '--name', cosmos_account,
-        '--resource-group', resource_group,
-        '--output', 'none'
-    ]
-    if cli.invoke(parameters):
-        raise CLIError('Fail to show CosmosDb account %s info.' % cosmos_account)
-    kind = cli.result.result['kind']
-    capabilites = cli.result.result['capabilities']
+def _get_cosmos_database_type_of(kind, capabilites):
     if kind == COSMOSDB_KIND[0]:
-        for item in capabilites:
-            if item['name'] == COSMOS_CAPABILITES[0]:
+        for name in capabilites:
+            if name == COSMOS_CAPABILITES[0]:
                 return COSMOS_DATABASE_TYPE[0]
-            if item['name'] == COSMOS_CAPABILITES[1]:
+            if name == COSMOS_CAPABILITES[1]:
                 return COSMOS_DATABASE_TYPE[1]
-            if item['name'] == COSMOS_CAPABILITES[2]:
+            if name == COSMOS_CAPABILITES[2]:
                 return COSMOS_DATABASE_TYPE[2]
         return COSMOS_DATABASE_TYPE[3]
     if kind == COSMOSDB_KIND[1]:
@@ -60,84 +105,366 @@ def _get_cosmos_database_type(resource_group, cosmos_account):
     raise Exception('CosmosDB database type not supported')
 
 
-def _update_postgres_server(target, password):
-    cli = get_default_cli()
-    parameters = [
-        'postgres', 'server', 'update',
-        '--ids', target,
-        '--admin-password', password
-    ]
-    rc = cli.invoke(parameters)
-    return rc
-
-
-def _get_target_id(scope, sql=None, mysql=None, postgres=None, cosmos=None, database=None, signalR=None, keyvault=None):
-    if sql and database:
-        sql = sql if _is_resourcid(sql) else '{0}/providers/Microsoft.Sql/servers/{1}'.format(scope, sql)
-        return '{0}/databases/{1}/'.format(sql, database)
-    if mysql and database:
-        mysql = mysql if _is_resourcid(mysql) else '{0}/providers/Microsoft.DBforMySQL/servers/{1}'.format(scope, mysql)
-        return '{0}/databases/{1}'.format(mysql, database)
-    if postgres and database:
-        postgres = postgres if _is_resourcid(postgres) else '{0}/providers/Microsoft.DBforPostgreSQL/servers/{1}'.format(scope, postgres)
-        return '{0}/databases/{1}'.format(postgres, database)
-    if cosmos and database:
-        if _is_resourcid(cosmos):
-            cosmos_id = cosmos
+def _update_postgres_server(cmd, target, password):
+    # update the admin password through the management API instead of a nested "az postgres server update"
+    from azure.cli.core.commands.client_factory import get_mgmt_service_client
+    from azure.mgmt.rdbms.postgresql import PostgreSQLManagementClient
+    from azure.mgmt.rdbms.postgresql.models import ServerUpdateParameters
+    from azure.cli.core.commands import LongRunningOperation
+    server_id = ResourceId.parse(target)
+    client = get_mgmt_service_client(cmd.cli_ctx, PostgreSQLManagementClient, subscription_id=server_id.subscription)
+    parameters = ServerUpdateParameters(administrator_login_password=password)
+    poller = client.servers.begin_update(server_id.resource_group, server_id.resource_name, parameters)
+    return LongRunningOperation(cmd.cli_ctx)(poller)
+
+
+def _find_resource(scope, namespace, resource_type, name, index=None):
+    # without an index the resource is assumed to be in the scope resource group
+    if index is None:
+        return scope.resource(namespace, resource_type, name)
+    return index.find(scope.resource_group, namespace, resource_type, name)
+
+
+def _get_resource_id(scope, value, target_key, index=None):
+    # the value is either the name of a resource in the scope resource group or the ID of any resource
+    if ResourceId.is_resource_id(value):
+        return ResourceId.parse(value)
+    namespace, resource_type = TARGET_TYPES[target_key]
+    return _find_resource(scope, namespace, resource_type, value, index)
+
+
+def _get_target_id(
+    cmd, scope, sql=None, mysql=None, postgres=None, cosmos=None, database=None, signalR=None, keyvault=None, refresh=False,
+    index=None
+):
+    with span('resolve.target_id'):
+        if sql and database:
+            return str(_get_resource_id(scope, sql, 'sql', index).child('databases', database))
+        if mysql and database:
+            return str(_get_resource_id(scope, mysql, 'mysql', index).child('databases', database))
+        if postgres and database:
+            return str(_get_resource_id(scope, postgres, 'postgres', index).child('databases', database))
+        if cosmos and database:
+            cosmos_id = _get_resource_id(scope, cosmos, 'cosmos', index)
+            record = index.get(cosmos_id) if index is not None else None
+            if record and record.get('kind'):
+                # the query already returned the account, no need to read it again
+                database_type = _get_cosmos_database_type_of(
+                    record['kind'], [item.get('name') for item in record.get('capabilities') or []])
+                _cosmos_database_types.set(str(cosmos_id).lower(), database_type)
+            else:
+                database_type = _get_cosmos_database_type(cmd, str(cosmos_id), refresh)
+            return str(cosmos_id.child(database_type, database))
+        if signalR:
+            return str(_get_resource_id(scope, signalR, 'signalR', index))
+        if keyvault:
+            return str(_get_resource_id(scope, keyvault, 'keyvault', index))
         else:
-            cosmos_id = '{0}/providers/Microsoft.DocumentDb/databaseAccounts/{1}'.format(scope, cosmos)
-        database_type = _get_cosmos_database_type(_get_rg_from_scope(scope), cosmos)
-        return '{0}/{1}/{2}'.format(cosmos_id, database_type, database)
-    if signalR:
-        return signalR if _is_resourcid(signalR) else '{0}/providers/Microsoft.SignalRService/signalR/{1}'.format(scope, signalR)
-    if keyvault:
-        return keyvault if _is_resourcid(keyvault) else '{0}/providers/Microsoft.KeyVault/vaults/{1}'.format(scope, keyvault)
+            raise Exception('Target resource is not valid')
+
+
+def _get_source_id(scope, source_type, appname, springcloud=None, function_name=None, index=None):
+    if source_type == 'webapp':
+        return str(_find_resource(scope, 'Microsoft.Web', 'sites', appname, index))
+    if source_type == 'springcloud':
+        return str(_find_resource(scope, 'Microsoft.AppPlatform', 'Spring', springcloud, index).child('Apps', appname))
+    if source_type == 'function':
+        return str(_find_resource(scope, 'Microsoft.Web', 'sites', appname, index).child('functions', function_name))
+    raise Exception('Source type {0} is not supported'.format(source_type))
+
+
+def _get_token_types(target=None, authtype=None):
+    token_types = set()
+    if authtype in [AuthType.MSI.value, AuthType.SP.value]:
+        token_types.add('graph')
+    if target:
+        target_id = target.lower()
+        if SQL_PROVIDER in target_id:
+            token_types.add('sql')
+        if any(provider in target_id for provider in RDBMS_PROVIDERS):
+            token_types.add('oss-rdbms')
+    return token_types
+
+
+def _get_token_cache_scope(cmd):
+    # tenant, subscription and user of the tokens of get_access_token, or None when the account is not known
+    from azure.cli.core._profile import Profile
+    try:
+        account = Profile(cli_ctx=cmd.cli_ctx).get_subscription()
+        return '{0}/{1}/{2}'.format(account['tenantId'], account['id'], account['user']['name']).lower()
+    except Exception as e:  # pylint: disable=broad-except
+        logger.debug('Access tokens are not cached: %s', e)
+        return None
+
+
+def _create_api(cmd, token_types=None, pool_size=None):
+    # the profile module and requests are only loaded by the commands which call the service
+    from azure.cli.command_modules.profile.custom import get_access_token
+    from ._apis import CupertinoApi, get_token_expiry
+    # the ARM token is always needed, the others only for the targets in play
+    token_args = [('arm', {})] + [(token_type, kwargs) for token_type, kwargs in TOKEN_TYPES
+                                  if token_types and token_type in token_types]
+    scope = _get_token_cache_scope(cmd)
+
+    def _get_token(token_type, kwargs):
+        key = '{0}/{1}'.format(scope, kwargs.get('resource') or kwargs.get('resource_type') or 'arm')
+        with span('auth.get_access_token', token_type=token_type) as token_span:
+            token = _access_tokens.get_token(key) if scope else None
+            token_span.attributes['cached'] = token is not None
+            if token is None:
+                token = get_access_token(cmd, **kwargs)
+                expires_on = get_token_expiry(token)
+                if scope and expires_on:
+                    _access_tokens.set_token(key, token, expires_on)
+            return token
+
+    if len(token_args) == 1:
+        tokens = {'arm': _get_token('arm', {})}
     else:
-        raise Exception('Target resource is not valid')
+        with ThreadPoolExecutor(max_workers=len(token_args)) as executor:
+            futures = [(token_type, executor.submit(_get_token, token_type, kwargs)) for token_type, kwargs in token_args]
+            tokens = {token_type: future.result() for token_type, future in futures}
+    return CupertinoApi(
+        tokens['arm'], tokens.get('graph'), tokens.get('sql'), tokens.get('oss-rdbms'), pool_size=pool_size,
+        response_cache=_connection_responses
+    )
 
 
-def _create_api(cmd):
-    authtoken = get_access_token(cmd)
-    graphtoken = get_access_token(cmd, resource='https://graph.windows.net/')
-    sqltoken = get_access_token(cmd, resource='https://database.windows.net')
-    mysqltoken = get_access_token(cmd, resource_type='oss-rdbms')
-    return CupertinoApi(authtoken, graphtoken, sqltoken, mysqltoken)
+def _load_json(content):
+    # decode the response bytes directly instead of the text copy of requests
+    with span('json.decode', bytes=len(content)):
+        return loads(content)
 
 
-def _bind(
-    cmd, subscription, resource_group, name, source, target, authtype, permission=None, client_id=None,
-    client_secret=None, username=None, password=None, additional_info={}
-):
+def _print_json(obj):
+    with span('json.output'):
+        print(dumps_pretty(obj))
+
+
+def _write_raw(result):
+    # pass the response body through as received, without decoding and encoding it again
+    sys.stdout.flush()
+    sys.stdout.buffer.write(result.content)
+    if not result.content.endswith(b'\n'):
+        sys.stdout.buffer.write(b'\n')
+    sys.stdout.flush()
+
+
+def _run_parallel(func, items, max_parallel, on_done=None):
+    # run func on every item with at most max_parallel workers and keep going when one item fails
+    results = [None] * len(items)
+    if not items:
+        return results
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(items)))) as executor:
+        futures = {executor.submit(func, item): index for index, item in enumerate(items)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = (future.result(), None)
+            except Exception as e:  # pylint: disable=broad-except
+                results[index] = (None, e)
+            if on_done:
+                on_done(items[index], *results[index])
+    return results
+
+
+def _make_auth_info(authtype, permission=None, client_id=None, client_secret=None, username=None, password=None):
     if not AuthType.has_value(authtype):
         raise Exception('Auth type not supported')
-    auth_info = AuthInfo(
+    return AuthInfo(
         AuthType(authtype), permission, client_id, client_secret, username, password
     )
-    api = _create_api(cmd)
-    result = api.create(subscription, resource_group, name, source, target, auth_info, additional_info)
+
+
+def _create_connection(
+    api, subscription, resource_group, name, source, target, authtype, permission=None, client_id=None,
+    client_secret=None, username=None, password=None, additional_info={}, no_wait=False
+):
+    auth_info = _make_auth_info(authtype, permission, client_id, client_secret, username, password)
+    result = api.create(subscription, resource_group, name, source, target, auth_info, additional_info, no_wait)
+    operation = api.get_operation(result) if no_wait else None
+    if operation:
+        return _make_accepted_result(name, operation)
     if result.ok is not True:
         err_msg = 'Fail to bind {0} with {1}. Code:{2}. Detail:{3}'.format(source, target, result.status_code, result.text)
         raise Exception(err_msg)
-    res_obj = json.loads(result.text)
+    res_obj = _load_json(result.content)
     return res_obj
 
 
+def _bind(
+    cmd, subscription, resource_group, name, source, target, authtype, permission=None, client_id=None,
+    client_secret=None, username=None, password=None, additional_info={}, no_wait=False
+):
+    api = _create_api(cmd, _get_token_types(target, authtype))
+    return _create_connection(
+        api, subscription, resource_group, name, source, target, authtype, permission,
+        client_id, client_secret, username, password, additional_info, no_wait
+    )
+
+
+def _load_manifest(manifest):
+    is_yaml = manifest.lower().endswith(('.yaml', '.yml'))
+    errors = (IOError, ValueError)
+    if is_yaml:
+        import yaml
+        # the parse errors of yaml are not ValueErrors
+        errors += (yaml.YAMLError,)
+    try:
+        with open(manifest) as f:
+            content = f.read()
+        data = yaml.safe_load(content) if is_yaml else json.loads(content)
+    except errors as e:
+        raise CLIError('Fail to load manifest {0}. Detail:{1}'.format(manifest, e))
+    if isinstance(data, dict):
+        data = data.get('connections')
+    if not isinstance(data, list) or not all(isinstance(entry, dict) for entry in data):
+        raise CLIError('Manifest {0} should contain a list of connections'.format(manifest))
+    return data
+
+
+def _resolve_manifest_entry(cmd, subscription, resource_group, entry, refresh=False, index=None):
+    # turn one manifest entry into the arguments of CupertinoApi.create
+    name = entry.get('name')
+    if not name:
+        raise Exception('Connection name is required')
+    resource_group = entry.get('resourceGroup', resource_group)
+    if not resource_group:
+        raise Exception('Resource group is required for connection {0}'.format(name))
+    source = entry.get('source') or {}
+    target = entry.get('target') or {}
+    auth = entry.get('auth') or {}
+    source_type = source.get('type', 'webapp')
+    if source_type not in SOURCE_TYPES:
+        raise Exception('Source type {0} is not supported'.format(source_type))
+    unknown_keys = set(target) - set(TARGET_KEYS)
+    if unknown_keys:
+        raise Exception('Unknown target properties: {0}'.format(', '.join(sorted(unknown_keys))))
+    scope = ResourceId.from_parts(subscription, resource_group)
+    if source.get('id'):
+        source_id = str(ResourceId.parse(source['id']))
+    else:
+        source_id = _get_source_id(
+            scope, source_type, source.get('app'), source.get('springCloud'), source.get('function'), index
+        )
+    target_id = _get_target_id(cmd, scope, refresh=refresh, index=index, **target)
+    additional_info = dict(entry.get('additionalInfo') or {})
+    if source_type == 'function':
+        additional_info.setdefault('BindingType', source.get('bindingType'))
+    return {
+        'resource_group': resource_group,
+        'name': name,
+        'source': source_id,
+        'target': target_id,
+        'authtype': auth.get('type', 'MSI' if source_type == 'webapp' else 'Secret'),
+        'permission': auth.get('permission'),
+        'client_id': auth.get('clientId'),
+        'client_secret': auth.get('clientSecret'),
+        'username': auth.get('username'),
+        'password': auth.get('password'),
+        'additional_info': additional_info
+    }
+
+
+def _get_manifest_names(entries):
+    # names of the resources the entries refer to by name rather than ID, by resource type
+    names_by_type = {}
+
+    def _add(namespace, resource_type, name):
+        if name and not ResourceId.is_resource_id(name):
+            names_by_type.setdefault('{0}/{1}'.format(namespace, resource_type), set()).add(name)
+
+    for entry in entries:
+        source = entry.get('source') or {}
+        target = entry.get('target') or {}
+        if not source.get('id'):
+            if source.get('type', 'webapp') == 'springcloud':
+                _add('Microsoft.AppPlatform', 'Spring', source.get('springCloud'))
+            else:
+                _add('Microsoft.Web', 'sites', source.get('app'))
+        for target_key, (namespace, resource_type) in TARGET_TYPES.items():
+            if isinstance(target.get(target_key), str):
+                _add(namespace, resource_type, target[target_key])
+    return names_by_type
+
+
+def _build_resource_index(cmd, subscription, entries):
+    from ._resolver import build_index, get_backend
+    return build_index(get_backend(cmd), subscription, _get_manifest_names(entries))
+
+
+def _resolve_manifest(cmd, subscription, manifest, resource_group, max_parallel, refresh, resolve_names=False):
+    entries = _load_manifest(manifest)
+    # one query finds every resource named by the manifest, wherever it is in the subscription
+    index = _build_resource_index(cmd, subscription, entries) if resolve_names else None
+    # resolve every entry first so one token set covering all targets can be fetched
+    resolved = _run_parallel(
+        lambda entry: _resolve_manifest_entry(cmd, subscription, resource_group, entry, refresh, index), entries,
+        max_parallel
+    )
+    token_types = set()
+    for kwargs, _ in resolved:
+        if kwargs:
+            token_types.update(_get_token_types(kwargs['target'], kwargs['authtype']))
+    return entries, resolved, token_types
+
+
+def _log_entry_done(kwargs, _, error):
+    if error:
+        logger.warning('Connection %s failed: %s', kwargs['name'], error)
+    else:
+        logger.info('Connection %s succeeded', kwargs['name'])
+
+
+def _make_accepted_result(name, operation):
+    # returned instead of the connection when --no-wait leaves a long running operation behind
+    return {
+        'name': name,
+        'status': 'Accepted',
+        'operation': operation
+    }
+
+
+def _make_entry_result(name, resource_group, result, error):
+    if error:
+        status = 'Failed'
+    elif isinstance(result, dict) and result.get('status') == 'Accepted' and 'operation' in result:
+        status = 'Accepted'
+    else:
+        status = 'Succeeded'
+    entry_result = {
+        'name': name,
+        'resourceGroup': resource_group,
+        'status': status
+    }
+    if error:
+        entry_result['error'] = str(error)
+    else:
+        entry_result['result'] = result
+    return entry_result
+
+
 def bind_webapp(
     cmd, resource_group, name, appname, authtype='MSI', permission=None,
     sql=None, mysql=None, postgres=None, cosmos=None, database=None, client_id=None,
     client_secret=None, username=None, password=None,
-    keyvault=None
+    keyvault=None, refresh=False, no_wait=False, timings=False
 ):
+    if timings:
+        start_recording()
     try:
         subscription = get_subscription_id(cmd.cli_ctx)
-        scope = '/subscriptions/{0}/resourceGroups/{1}'.format(subscription, resource_group)
-        source = '{0}/providers/Microsoft.Web/sites/{1}'.format(scope, appname)
-        target = _get_target_id(scope, sql=sql, cosmos=cosmos, mysql=mysql, postgres=postgres, database=database, keyvault=keyvault)
+        scope = ResourceId.from_parts(subscription, resource_group)
+        source = _get_source_id(scope, 'webapp', appname)
+        target = _get_target_id(
+            cmd, scope, sql=sql, cosmos=cosmos, mysql=mysql, postgres=postgres, database=database, keyvault=keyvault,
+            refresh=refresh
+        )
         result = _bind(
             cmd, subscription, resource_group, name, source,
-            target, authtype, permission, client_id, client_secret, username, password
+            target, authtype, permission, client_id, client_secret, username, password, no_wait=no_wait
         )
-        print(json.dumps(result, indent=2))
+        _print_json(result)
     except Exception as e:
         print(e)
         logger.error(e)
@@ -147,8 +474,11 @@ def bind_webapp(
 def bind_webapp_postgres(
     cmd, resource_group, appname, server, database,
     name=None, client_id=None, client_secret=None,
-    username=None, password=None, authtype='Secret', permission=None
+    username=None, password=None, authtype='Secret', permission=None, timings=False
 ):
+    if timings:
+        start_recording()
+    from knack.prompting import prompt, prompt_pass, prompt_choice_list
     try:
         if authtype == 'Secret':
             if not username:
@@ -158,9 +488,9 @@ def bind_webapp_postgres(
         if not name:
             name = '{0}_{1}_{2}_{3}_{4}'.format(appname, server, database, int(time.time()), random.randint(10000, 99999)) 
         subscription = get_subscription_id(cmd.cli_ctx)
-        scope = '/subscriptions/{0}/resourceGroups/{1}'.format(subscription, resource_group)
-        source = '{0}/providers/Microsoft.Web/sites/{1}'.format(scope, appname)
-        target = _get_target_id(scope, postgres=server, database=database)
+        scope = ResourceId.from_parts(subscription, resource_group)
+        source = _get_source_id(scope, 'webapp', appname)
+        target = _get_target_id(cmd, scope, postgres=server, database=database)
         succeeded = False
         for i in range(3):
             try:
@@ -169,31 +499,33 @@ def bind_webapp_postgres(
                     target, authtype, permission, client_id, client_secret, username, password
                 )
             except Exception as e:
+                # transport failures are retried by CupertinoApi, only credential errors are handled here
                 s = str(e)
-                if s.find('\"UnauthorizedResourceAccess\"') and authtype == 'Secret':
-                    print('Admin username or password error, retry left: {0}'.format(3-i))
-                    choice_list = [
-                        're-input the password for the admin user \"{0}\"'.format(username),
-                        'Change the password for the admin user \"{0}\"'.format(username)
-                    ]
-                    choice = prompt_choice_list('Select re-input the admin password or change the admin password',
-                                                choice_list)
-                    if choice == 0:
-                        password = prompt_pass(msg='Password: ')
-                    elif choice == 1:
-                        password = prompt_pass(msg='New password: ')
-                        _update_postgres_server(target, password)
-                    continue
+                if s.find('\"UnauthorizedResourceAccess\"') == -1 or authtype != 'Secret':
+                    raise
+                print('Admin username or password error, retry left: {0}'.format(3-i))
+                choice_list = [
+                    're-input the password for the admin user \"{0}\"'.format(username),
+                    'Change the password for the admin user \"{0}\"'.format(username)
+                ]
+                choice = prompt_choice_list('Select re-input the admin password or change the admin password',
+                                            choice_list)
+                if choice == 0:
+                    password = prompt_pass(msg='Password: ')
+                elif choice == 1:
+                    password = prompt_pass(msg='New password: ')
+                    _update_postgres_server(cmd, target, password)
+                continue
             else:
                 succeeded = True
-                print(json.dumps(result, indent=2))
+                _print_json(result)
                 break
         if not succeeded:
             result = _bind(
                 cmd, subscription, resource_group, name, source,
                 target, authtype, permission, client_id, client_secret, username, password
             )
-            print(json.dumps(result, indent=2))
+            _print_json(result)
     except Exception as e:
         print(e)
         logger.error(e)
@@ -201,18 +533,21 @@ def bind_webapp_postgres(
 
 
 def bind_springcloud(
-    cmd, resource_group, name, springcloud, appname, mysql=None, cosmos=None, database=None, username=None, password=None
+    cmd, resource_group, name, springcloud, appname, mysql=None, cosmos=None, database=None, username=None, password=None,
+    refresh=False, no_wait=False, timings=False
 ):
+    if timings:
+        start_recording()
     try:
         subscription = get_subscription_id(cmd.cli_ctx)
-        scope = '/subscriptions/{0}/resourceGroups/{1}'.format(subscription, resource_group)
-        source = '{0}/providers/Microsoft.AppPlatform/Spring/{1}/Apps/{2}'.format(scope, springcloud, appname)
-        target = _get_target_id(scope, mysql=mysql, cosmos=cosmos, database=database)
+        scope = ResourceId.from_parts(subscription, resource_group)
+        source = _get_source_id(scope, 'springcloud', appname, springcloud=springcloud)
+        target = _get_target_id(cmd, scope, mysql=mysql, cosmos=cosmos, database=database, refresh=refresh)
         result = _bind(
             cmd, subscription, resource_group, name, source,
-            target, authtype='Secret', username=username, password=password
+            target, authtype='Secret', username=username, password=password, no_wait=no_wait
         )
-        print(json.dumps(result, indent=2))
+        _print_json(result)
     except Exception as e:
         print(e)
         logger.error(e)
@@ -221,51 +556,515 @@ def bind_springcloud(
 
 def bind_function(
     cmd, resource_group, name, appname, function_name=None,
-    signalR=None, binding=None, username=None, password=None
+    signalR=None, binding=None, username=None, password=None, no_wait=False, timings=False
 ):
+    if timings:
+        start_recording()
     try:
         subscription = get_subscription_id(cmd.cli_ctx)
-        scope = '/subscriptions/{0}/resourceGroups/{1}'.format(subscription, resource_group)
-        source = '{0}/providers/Microsoft.Web/sites/{1}/functions/{2}'.format(scope, appname, function_name)
-        target = _get_target_id(scope, signalR=signalR)
+        scope = ResourceId.from_parts(subscription, resource_group)
+        source = _get_source_id(scope, 'function', appname, function_name=function_name)
+        target = _get_target_id(cmd, scope, signalR=signalR)
         additional_info = {'BindingType': binding}
         result = _bind(
             cmd, subscription, resource_group, name, source,
-            target, 'Secret', None, None, None, username, password, additional_info)
-        print(json.dumps(result, indent=2))
+            target, 'Secret', None, None, None, username, password, additional_info, no_wait)
+        _print_json(result)
+    except Exception as e:
+        print(e)
+        logger.error(e)
+        sys.exit(1)
+
+
+def batch_bind(
+    cmd, manifest, resource_group=None, max_parallel=DEFAULT_MAX_PARALLEL, refresh=False, no_wait=False,
+    resolve_names=False, timings=False
+):
+    if timings:
+        start_recording()
+    try:
+        subscription = get_subscription_id(cmd.cli_ctx)
+        entries, resolved, token_types = _resolve_manifest(
+            cmd, subscription, manifest, resource_group, max_parallel, refresh, resolve_names
+        )
+        connections = [kwargs for kwargs, _ in resolved if kwargs]
+        api = _create_api(cmd, token_types, pool_size=max_parallel) if connections else None
+        created = iter(_run_parallel(
+            lambda kwargs: _create_connection(api, subscription, no_wait=no_wait, **kwargs), connections, max_parallel,
+            _log_entry_done
+        ))
+        results = []
+        for entry, (kwargs, error) in zip(entries, resolved):
+            if error:
+                results.append(_make_entry_result(entry.get('name'), entry.get('resourceGroup', resource_group), None, error))
+            else:
+                results.append(_make_entry_result(kwargs['name'], kwargs['resource_group'], *next(created)))
+        _print_json(results)
+    except Exception as e:
+        print(e)
+        logger.error(e)
+        sys.exit(1)
+    if any(result['status'] == 'Failed' for result in results):
+        sys.exit(1)
+
+
+def _validate_connection(api, subscription, resource_group, name, no_wait=False, raw=False):
+    result = api.validate(subscription, resource_group, name, no_wait)
+    operation = api.get_operation(result) if no_wait else None
+    if operation:
+        return _make_accepted_result(name, operation)
+    if result.ok is not True:
+        err_msg = 'Fail to validate the connection {0}. Code:{1}. Detail:{2}'.format(name, result.status_code, result.text)
+        raise Exception(err_msg)
+    if raw:
+        return result
+    res_obj = _load_json(result.content)
+    return res_obj
+
+
+def _get_validation_state(entry_result):
+    # the output of a connection which is compared between the cycles of --watch
+    return dumps({key: entry_result.get(key) for key in ['status', 'result', 'error']})
+
+
+def _tokens_expire_soon(api):
+    expires_on = api.token_expires_on()
+    return expires_on is not None and expires_on - time.time() < TOKEN_REFRESH_SKEW
+
+
+def _write_watch_changes(changes, cycle):
+    timestamp = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    for entry_result in changes:
+        entry_result['cycle'] = cycle
+        entry_result['time'] = timestamp
+        sys.stdout.write(dumps(entry_result).decode('utf-8') + '\n')
+    sys.stdout.flush()
+
+
+def _watch_validation(cmd, subscription, resource_group, name, interval, max_parallel):
+    # one process, one set of tokens and the pooled session of the module stay warm between the cycles.
+    # A connection is written as a JSON line when its validation state changes, the first cycle writes them all.
+    states = {}
+    api = None
+    cycle = 0
+    list_error = None
+    while True:
+        cycle += 1
+        started = time.time()
+        try:
+            if api is None or _tokens_expire_soon(api):
+                api = _create_api(cmd, ALL_TOKEN_TYPES, pool_size=max_parallel)
+            names = name or [connection['name'] for connection in api.list(subscription, resource_group)]
+        except Exception as e:  # pylint: disable=broad-except
+            # e.g. a short outage of the service, keep the states and try again on the next cycle
+            if list_error != str(e):
+                list_error = str(e)
+                _write_watch_changes([{'resourceGroup': resource_group, 'status': 'Error', 'error': list_error}], cycle)
+            logger.warning('Cycle %d: fail to list the connections: %s', cycle, e)
+            time.sleep(max(0, interval - (time.time() - started)))
+            continue
+        list_error = None
+        validated = _run_parallel(
+            lambda connection_name: _validate_connection(api, subscription, resource_group, connection_name),
+            names, max_parallel
+        )
+        latency = time.time() - started
+        changes = []
+        for connection_name, (result, error) in zip(names, validated):
+            entry_result = _make_entry_result(connection_name, resource_group, result, error)
+            state = _get_validation_state(entry_result)
+            if states.get(connection_name) != state:
+                changes.append(entry_result)
+            states[connection_name] = state
+        for connection_name in [connection_name for connection_name in states if connection_name not in names]:
+            # deleted since the previous cycle
+            del states[connection_name]
+            changes.append({'name': connection_name, 'resourceGroup': resource_group, 'status': 'Deleted'})
+        _write_watch_changes(changes, cycle)
+        logger.warning('Cycle %d: validated %d connections in %.3fs, %d changed, %d failed', cycle, len(names),
+                       latency, len(changes), sum(1 for _, error in validated if error))
+        time.sleep(max(0, interval - (time.time() - started)))
+
+
+def validate_general(
+    cmd, resource_group, name=None, max_parallel=DEFAULT_MAX_PARALLEL, no_wait=False, raw_output=False, watch=False,
+    interval=DEFAULT_WATCH_INTERVAL, timings=False
+):
+    if timings and not watch:
+        start_recording()
+    try:
+        if raw_output and (no_wait or not name or len(name) != 1):
+            raise CLIError('--raw needs exactly one connection name and can not be used with --no-wait')
+        if watch and (raw_output or no_wait or timings):
+            # the spans of every cycle would be kept until the watch is interrupted
+            raise CLIError('--watch can not be used with --raw, --no-wait or --timings')
+        if watch and interval < 1:
+            raise CLIError('--interval must be at least 1 second')
+        subscription = get_subscription_id(cmd.cli_ctx)
+        if watch:
+            try:
+                _watch_validation(cmd, subscription, resource_group, name, interval, max_parallel)
+            except KeyboardInterrupt:
+                pass
+            return
+        # the target of the connection is not known locally, so send every token for validation
+        api = _create_api(cmd, ALL_TOKEN_TYPES, pool_size=max_parallel)
+        if raw_output:
+            _write_raw(_validate_connection(api, subscription, resource_group, name[0], raw=True))
+            return
+        if name and len(name) == 1:
+            res_obj = _validate_connection(api, subscription, resource_group, name[0], no_wait)
+            _print_json(res_obj)
+            return
+        # validate the given connections or every connection in the resource group
+        names = name or [connection['name'] for connection in api.list(subscription, resource_group)]
+        validated = _run_parallel(
+            lambda connection_name: _validate_connection(api, subscription, resource_group, connection_name, no_wait),
+            names, max_parallel
+        )
+        results = [
+            _make_entry_result(connection_name, resource_group, result, error)
+            for connection_name, (result, error) in zip(names, validated)
+        ]
+        _print_json(results)
     except Exception as e:
         print(e)
         logger.error(e)
         sys.exit(1)
+    if any(result['status'] == 'Failed' for result in results):
+        sys.exit(1)
+
+
+def _wait_operation(api, operation):
+    result = api.wait(operation)
+    if result.ok is not True:
+        err_msg = 'Fail to wait for the operation. Code:{0}. Detail:{1}'.format(result.status_code, result.text)
+        raise Exception(err_msg)
+    res_obj = _load_json(result.content) if result.content else {}
+    return res_obj
 
 
-def validate_general(cmd, resource_group, name):
+def wait_general(cmd, operation, max_parallel=DEFAULT_MAX_PARALLEL, timings=False):
+    if timings:
+        start_recording()
+    from ._apis import decode_operation
+    try:
+        # polling only needs the ARM token
+        api = _create_api(cmd, pool_size=max_parallel)
+        if len(operation) == 1:
+            res_obj = _wait_operation(api, operation[0])
+            _print_json(res_obj)
+            return
+        waited = _run_parallel(lambda handle: _wait_operation(api, handle), operation, max_parallel)
+        results = []
+        for handle, (result, error) in zip(operation, waited):
+            try:
+                details = decode_operation(handle)
+            except Exception:  # pylint: disable=broad-except
+                details = {}
+            results.append(_make_entry_result(details.get('name'), details.get('resourceGroup'), result, error))
+        _print_json(results)
+    except Exception as e:
+        print(e)
+        logger.error(e)
+        sys.exit(1)
+    if any(result['status'] == 'Failed' for result in results):
+        sys.exit(1)
+
+
+def _write_stream(items, ndjson=False):
+    # write every item as soon as it arrives instead of collecting the whole list first
+    if ndjson:
+        for item in items:
+            sys.stdout.write(dumps(item).decode('utf-8') + '\n')
+            sys.stdout.flush()
+        return
+    separator = '[\n'
+    for item in items:
+        sys.stdout.write(separator + '\n'.join('  ' + line for line in dumps_pretty(item).splitlines()))
+        sys.stdout.flush()
+        separator = ',\n'
+    sys.stdout.write('[]\n' if separator == '[\n' else '\n]\n')
+
+
+def list_general(cmd, resource_group=None, ndjson=False, timings=False):
+    if timings:
+        start_recording()
     try:
         subscription = get_subscription_id(cmd.cli_ctx)
         api = _create_api(cmd)
-        result = api.validate(subscription, resource_group, name)
-        if result.ok is not True:
-            err_msg = 'Fail to validate the connection {0}. Code:{1}. Detail:{2}'.format(name, result.status_code, result.text)
-            raise Exception(err_msg)
-        res_obj = json.loads(result.text)
-        print(json.dumps(res_obj, indent=2))
+        _write_stream(api.list(subscription, resource_group), ndjson)
     except Exception as e:
         print(e)
         logger.error(e)
         sys.exit(1)
 
 
-def get_general(cmd, resource_group, name):
+def _get_connection(api, subscription, resource_group, name, use_cache=True):
+    result = api.get(subscription, resource_group, name, use_cache=use_cache)
+    if result.ok is not True:
+        err_msg = 'Fail to get the connection {0}. Code:{1}. Detail:{2}'.format(name, result.status_code, result.text)
+        raise Exception(err_msg)
+    return result
+
+
+def get_general(cmd, resource_group, name, no_cache=False, raw_output=False, timings=False):
+    if timings:
+        start_recording()
     try:
         subscription = get_subscription_id(cmd.cli_ctx)
         api = _create_api(cmd)
-        result = api.get(subscription, resource_group, name)
-        if result.ok is not True:
-            err_msg = 'Fail to get the connection {0}. Code:{1}. Detail:{2}'.format(name, result.status_code, result.text)
-            raise Exception(err_msg)
-        res_obj = json.loads(result.text)
-        print(json.dumps(res_obj, indent=2))
+        result = _get_connection(api, subscription, resource_group, name, use_cache=not no_cache)
+        if raw_output:
+            _write_raw(result)
+            return
+        res_obj = _load_json(result.content)
+        _print_json(res_obj)
+    except Exception as e:
+        print(e)
+        logger.error(e)
+        sys.exit(1)
+
+
+def _strip_write_only(value):
+    if isinstance(value, dict):
+        return {key: item for key, item in value.items() if key not in WRITE_ONLY_PROPERTIES}
+    return value
+
+
+def _normalize_property(key, value):
+    # IDs are case insensitive, and unset values are the same whether they are null, empty or missing
+    if key in ['sourceId', 'targetId']:
+        return value.rstrip('/').lower() if value else None
+    if isinstance(value, dict):
+        value = {item_key: item for item_key, item in _strip_write_only(value).items() if item not in [None, [], {}]}
+    return value or None
+
+
+def _diff_connection(desired, current):
+    changes = []
+    for key in APPLY_PROPERTIES:
+        if _normalize_property(key, desired.get(key)) != _normalize_property(key, current.get(key)):
+            changes.append({
+                'property': key,
+                'current': _strip_write_only(current.get(key)),
+                'desired': _strip_write_only(desired.get(key))
+            })
+    return changes
+
+
+def _plan_connection(api, subscription, kwargs):
+    # compare the properties a create would send with the ones of the existing connection
+    auth_info = _make_auth_info(
+        kwargs['authtype'], kwargs['permission'], kwargs['client_id'], kwargs['client_secret'], kwargs['username'],
+        kwargs['password']
+    )
+    desired = api.connection_properties(kwargs['source'], kwargs['target'], auth_info, kwargs['additional_info'])
+    # revalidate a cached response instead of trusting it, a 304 is as cheap as it gets
+    result = api.get(subscription, kwargs['resource_group'], kwargs['name'], max_age=0)
+    if result.status_code == 404:
+        return 'create', _diff_connection(desired, {})
+    if result.ok is not True:
+        err_msg = 'Fail to get the connection {0}. Code:{1}. Detail:{2}'.format(kwargs['name'], result.status_code, result.text)
+        raise Exception(err_msg)
+    changes = _diff_connection(desired, _load_json(result.content).get('properties') or {})
+    return ('update' if changes else 'unchanged'), changes
+
+
+def apply_general(
+    cmd, manifest, resource_group=None, max_parallel=DEFAULT_MAX_PARALLEL, refresh=False, plan=False, no_wait=False,
+    resolve_names=False, timings=False
+):
+    if timings:
+        start_recording()
+    try:
+        subscription = get_subscription_id(cmd.cli_ctx)
+        entries, resolved, token_types = _resolve_manifest(
+            cmd, subscription, manifest, resource_group, max_parallel, refresh, resolve_names
+        )
+        connections = [kwargs for kwargs, _ in resolved if kwargs]
+        api = _create_api(cmd, token_types, pool_size=max_parallel) if connections else None
+        planned = _run_parallel(lambda kwargs: _plan_connection(api, subscription, kwargs), connections, max_parallel)
+        # only the connections which are missing or differ are written
+        changed = [index for index, (result, _) in enumerate(planned) if result and result[0] != 'unchanged']
+        applied = {}
+        if not plan:
+            written = _run_parallel(
+                lambda kwargs: _create_connection(api, subscription, no_wait=no_wait, **kwargs),
+                [connections[index] for index in changed], max_parallel, _log_entry_done
+            )
+            applied = dict(zip(changed, written))
+        results = []
+        index = 0
+        for entry, (kwargs, error) in zip(entries, resolved):
+            if error:
+                results.append(_make_entry_result(entry.get('name'), entry.get('resourceGroup', resource_group), None, error))
+                continue
+            plan_result, error = planned[index]
+            if error:
+                entry_result = _make_entry_result(kwargs['name'], kwargs['resource_group'], None, error)
+            elif index in applied:
+                entry_result = _make_entry_result(kwargs['name'], kwargs['resource_group'], *applied[index])
+            else:
+                entry_result = {
+                    'name': kwargs['name'],
+                    'resourceGroup': kwargs['resource_group'],
+                    'status': 'Planned' if plan else 'Succeeded'
+                }
+            if plan_result:
+                entry_result['action'], entry_result['changes'] = plan_result
+            results.append(entry_result)
+            index += 1
+        _print_json(results)
     except Exception as e:
         print(e)
         logger.error(e)
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+    if any(result['status'] == 'Failed' for result in results):
+        sys.exit(1)
+
+
+def _make_api_getter(cmd, max_parallel):
+    # one client per token set, created again when its tokens are about to expire
+    apis = {}
+    lock = threading.Lock()
+
+    def _get_api(token_types):
+        key = frozenset(token_types or ())
+        with lock:
+            api = apis.get(key)
+            if api is None or _tokens_expire_soon(api):
+                api = apis[key] = _create_api(cmd, key, pool_size=max_parallel)
+        return api
+
+    return _get_api
+
+
+def _serve_request(cmd, subscription, get_api, request):
+    command = request.get('command')
+    name = request.get('name')
+    resource_group = request.get('resourceGroup')
+    result, error = None, None
+    try:
+        if command == 'bind':
+            kwargs = _resolve_manifest_entry(cmd, subscription, None, request)
+            resource_group = kwargs['resource_group']
+            api = get_api(_get_token_types(kwargs['target'], kwargs['authtype']))
+            result = _create_connection(api, subscription, no_wait=bool(request.get('noWait')), **kwargs)
+        elif command in ['validate', 'get']:
+            if not name or not resource_group:
+                raise Exception('name and resourceGroup are required')
+            if command == 'validate':
+                # the target of the connection is not known locally, so send every token for validation
+                result = _validate_connection(
+                    get_api(ALL_TOKEN_TYPES), subscription, resource_group, name, bool(request.get('noWait'))
+                )
+            else:
+                result = _load_json(_get_connection(
+                    get_api(None), subscription, resource_group, name, use_cache=not request.get('noCache')
+                ).content)
+        else:
+            raise Exception('Unknown command {0}'.format(command))
+    except Exception as e:  # pylint: disable=broad-except
+        error = e
+    return _make_entry_result(name, resource_group, result, error)
+
+
+def serve_general(cmd, socket_path=None, max_parallel=DEFAULT_MAX_PARALLEL):
+    from ._daemon import DaemonServer, get_client_path, get_socket_path
+    try:
+        subscription = get_subscription_id(cmd.cli_ctx)
+        get_api = _make_api_getter(cmd, max_parallel)
+        # fetch the ARM token before the first request arrives
+        get_api(None)
+        server = DaemonServer(
+            socket_path or get_socket_path(), lambda request: _serve_request(cmd, subscription, get_api, request),
+            max_parallel
+        )
+        logger.warning('Serving connect requests on %s, stop with Ctrl+C', server.path)
+        logger.warning('Send requests with: python %s', get_client_path())
+        server.serve_forever()
+    except Exception as e:
+        print(e)
+        logger.error(e)
+        sys.exit(1)
+
+
+def _export_connection(output_dir, export_format, state, connection, force=False):
+    # write the settings file of a connection unless it did not change since the previous export
+    from ._export import format_settings, get_connection_hash, get_connection_settings, get_export_file_name, write_file
+    key = connection['id'].lower()
+    file_name = get_export_file_name(connection['name'], export_format)
+    path = os.path.join(output_dir, file_name)
+    connection_hash = get_connection_hash(connection)
+    previous = state.get(key)
+    if not force and previous and previous['hash'] == connection_hash and previous['file'] == file_name and \
+            os.path.exists(path):
+        return 'Unchanged', file_name
+    write_file(path, format_settings(get_connection_settings(connection), export_format))
+    if previous and previous['file'] != file_name and os.path.exists(os.path.join(output_dir, previous['file'])):
+        # exported in another format before
+        os.remove(os.path.join(output_dir, previous['file']))
+    state[key] = {'name': connection['name'], 'hash': connection_hash, 'file': file_name}
+    return 'Written', file_name
+
+
+def export_general(
+    cmd, resource_group, output_dir, name=None, export_format='env', max_parallel=DEFAULT_MAX_PARALLEL, force=False,
+    timings=False
+):
+    if timings:
+        start_recording()
+    from ._export import load_state, save_state
+    try:
+        subscription = get_subscription_id(cmd.cli_ctx)
+        api = _create_api(cmd, pool_size=max_parallel)
+        if not os.path.isdir(output_dir):
+            os.makedirs(output_dir)
+        state = load_state(output_dir)
+        exported = set()
+        results = []
+
+        def _export(connection_name, connection, error):
+            # every file is written as soon as its connection arrives
+            if error:
+                results.append(_make_entry_result(connection_name, resource_group, None, error))
+                return
+            # the connection still exists even when its file can not be written, keep it from being deleted below
+            exported.add((connection.get('id') or '').lower())
+            try:
+                status, file_name = _export_connection(output_dir, export_format, state, connection, force)
+            except Exception as e:  # pylint: disable=broad-except
+                # a connection which can not be written fails on its own, the state of the others is still saved
+                results.append(_make_entry_result(connection_name, resource_group, None, e))
+                return
+            results.append({'name': connection['name'], 'resourceGroup': resource_group, 'status': status, 'file': file_name})
+
+        if name:
+            _run_parallel(
+                lambda connection_name: _load_json(
+                    _get_connection(api, subscription, resource_group, connection_name).content
+                ),
+                name, max_parallel, _export
+            )
+        else:
+            # the pages of the list already hold the whole connections, no need to get them one by one
+            for connection in api.list(subscription, resource_group):
+                _export(connection.get('name'), connection, None)
+            # remove the files of the connections deleted since the previous export of the resource group
+            scope = '{0}/'.format(ResourceId.from_parts(subscription, resource_group)).lower()
+            for key, entry in list(state.items()):
+                if key.startswith(scope) and key not in exported:
+                    del state[key]
+                    if os.path.exists(os.path.join(output_dir, entry['file'])):
+                        os.remove(os.path.join(output_dir, entry['file']))
+                    results.append({'name': entry['name'], 'resourceGroup': resource_group, 'status': 'Deleted',
+                                    'file': entry['file']})
+        save_state(output_dir, state)
+        _print_json(results)
+    except Exception as e:
+        print(e)
+        logger.error(e)
+        sys.exit(1)
+    if any(result['status'] == 'Failed' for result in results):
+        sys.exit(1)
@@ -0,0 +1,37 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import json
+import unittest
+from unittest import mock
+
+from azext_connect._apis import CupertinoApiBase
+
+HOST = 'https://cupertino.example.com'
+
+
+def _page(next_link):
+    return mock.Mock(ok=True, content=json.dumps({'value': [{'name': 'c1'}], 'nextLink': next_link}).encode('utf-8'))
+
+
+class ListPageTest(unittest.TestCase):
+    # the next pages are requested with the access tokens, so they must stay on the Cupertino host
+
+    def setUp(self):
+        with mock.patch.dict('os.environ', {'LOCAL_CONN_HOST': HOST}):
+            self.api = CupertinoApiBase({'accessToken': 'token'})
+
+    def test_next_link_on_host(self):
+        next_link = HOST + '/subscriptions/sub/providers/Microsoft.Cupertino/connections?skip=1'
+        self.assertEqual(self.api._parse_list_page('sub', _page(next_link)), ([{'name': 'c1'}], next_link))
+        self.assertEqual(self.api._parse_list_page('sub', _page(None)), ([{'name': 'c1'}], None))
+
+    def test_next_link_off_host(self):
+        for next_link in ['https://evil.example.com/connections', 'http://cupertino.example.com/connections']:
+            with self.assertRaises(Exception):
+                self.api._parse_list_page('sub', _page(next_link))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import json
+import unittest
+from unittest import mock
+
+from azext_connect import custom
+from azext_connect._apis import CupertinoApi, RateLimiter
+
+SOURCE_ID = '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Web/sites/app'
+TARGET_ID = '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Sql/servers/server/databases/db'
+AUTH_INFO = {'authType': 'Secret', 'permissions': None, 'id': 'admin', 'secret': 'password'}
+
+
+def _entry(**kwargs):
+    entry = {
+        'name': 'conn', 'resource_group': 'rg', 'source': SOURCE_ID, 'target': TARGET_ID, 'authtype': 'Secret',
+        'permission': None, 'client_id': None, 'client_secret': None, 'username': 'admin', 'password': 'password',
+        'additional_info': None
+    }
+    entry.update(kwargs)
+    return entry
+
+
+def _current(**kwargs):
+    # the service never returns the secret
+    properties = {
+        'sourceId': SOURCE_ID, 'targetId': TARGET_ID, 'additionalInfo': None,
+        'authInfo': {'authType': 'Secret', 'permissions': None, 'id': 'admin', 'secret': None}
+    }
+    properties.update(kwargs)
+    return properties
+
+
+class DiffConnectionTest(unittest.TestCase):
+
+    def test_normalize_ids(self):
+        for key in ['sourceId', 'targetId']:
+            self.assertEqual(custom._normalize_property(key, TARGET_ID.upper() + '/'), TARGET_ID.lower())
+            self.assertIsNone(custom._normalize_property(key, ''))
+            self.assertIsNone(custom._normalize_property(key, None))
+
+    def test_normalize_unset_values(self):
+        for value in [None, {}, {'key': None}, {'key': []}, {'key': {}}, {'secret': 'password'}]:
+            self.assertIsNone(custom._normalize_property('additionalInfo', value), value)
+        self.assertEqual(custom._normalize_property('additionalInfo', {'key': 'value', 'other': None}), {'key': 'value'})
+
+    def test_strip_secret(self):
+        self.assertEqual(custom._normalize_property('authInfo', AUTH_INFO),
+                         {'authType': 'Secret', 'id': 'admin'})
+
+    def test_no_changes(self):
+        desired = {'sourceId': SOURCE_ID.upper(), 'targetId': TARGET_ID + '/', 'authInfo': AUTH_INFO}
+        self.assertEqual(custom._diff_connection(desired, _current(additionalInfo={})), [])
+        del desired['sourceId']
+        self.assertEqual([change['property'] for change in custom._diff_connection(desired, _current())], ['sourceId'])
+
+    def test_changes(self):
+        desired = dict(_current(), additionalInfo={'key': 'value'}, authInfo=AUTH_INFO)
+        changes = custom._diff_connection(desired, _current(targetId=TARGET_ID.replace('db', 'other')))
+        self.assertEqual([change['property'] for change in changes], ['targetId', 'additionalInfo'])
+        self.assertEqual(changes[1], {'property': 'additionalInfo', 'current': None, 'desired': {'key': 'value'}})
+
+    def test_changes_without_secret(self):
+        desired = dict(_current(), authInfo=dict(AUTH_INFO, id='other'))
+        change, = custom._diff_connection(desired, _current())
+        # the password is never part of the plan
+        self.assertEqual(change['desired'], {'authType': 'Secret', 'permissions': None, 'id': 'other'})
+        self.assertNotIn('secret', change['current'])
+
+
+class PlanConnectionTest(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.dict('os.environ', {'LOCAL_CONN_HOST': 'https://cupertino.example.com'}):
+            self.api = CupertinoApi({'accessToken': 'token'}, response_cache=None,
+                                    rate_limiter=RateLimiter({'reads': 0, 'writes': 0}))
+        patch = mock.patch.object(self.api, 'get')
+        self.get = patch.start()
+        self.addCleanup(patch.stop)
+
+    def _reply(self, status_code, properties=None):
+        self.get.return_value = mock.Mock(
+            status_code=status_code, ok=status_code < 400, text='',
+            content=json.dumps({'name': 'conn', 'properties': properties}).encode('utf-8')
+        )
+
+    def test_not_found(self):
+        self._reply(404)
+        action, changes = custom._plan_connection(self.api, 'sub', _entry())
+        self.assertEqual(action, 'create')
+        self.assertEqual([change['property'] for change in changes], ['sourceId', 'targetId', 'authInfo'])
+        # the cached response is revalidated
+        self.get.assert_called_once_with('sub', 'rg', 'conn', max_age=0)
+
+    def test_unchanged(self):
+        self._reply(200, _current(sourceId=SOURCE_ID.lower() + '/'))
+        self.assertEqual(custom._plan_connection(self.api, 'sub', _entry()), ('unchanged', []))
+
+    def test_update(self):
+        self._reply(200, _current())
+        action, changes = custom._plan_connection(self.api, 'sub', _entry(username='other'))
+        self.assertEqual(action, 'update')
+        self.assertEqual([change['property'] for change in changes], ['authInfo'])
+
+    def test_error(self):
+        self._reply(500)
+        with self.assertRaisesRegex(Exception, 'Fail to get the connection conn'):
+            custom._plan_connection(self.api, 'sub', _entry())
+
+
+if __name__ == '__main__':
+    unittest.main()
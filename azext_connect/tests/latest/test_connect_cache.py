@@ -0,0 +1,132 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import json
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from azext_connect._cache import ResponseCache, TokenCache
+
+
+class ResponseCacheTest(unittest.TestCase):
+    # the entries are written once per process instead of on every change
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        patch = mock.patch('azext_connect._cache.get_cache_dir', return_value=self.cache_dir)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.cache = ResponseCache('responses.json', 30, 2, 3600)
+
+    def _read(self):
+        with open(self.cache.path) as f:
+            return json.load(f)
+
+    def test_flush_writes_once(self):
+        self.cache.set('a', {'body': '1'})
+        self.cache.set('b', {'body': '2'})
+        self.assertFalse(os.path.exists(self.cache.path))
+        self.cache.flush()
+        self.assertEqual(sorted(self._read()), ['a', 'b'])
+        os.remove(self.cache.path)
+        self.cache.flush()
+        self.assertFalse(os.path.exists(self.cache.path))
+
+    def test_evict_least_recently_used(self):
+        self.cache.set('a', {'body': '1'})
+        self.cache.set('b', {'body': '2'})
+        self.cache.lookup('a')
+        self.cache.set('c', {'body': '3'})
+        self.cache.flush()
+        self.assertEqual(sorted(self._read()), ['a', 'c'])
+
+    def test_touch_restarts_max_age_without_write(self):
+        with mock.patch('time.time', return_value=1000.0):
+            self.cache.set('a', {'body': '1'})
+        self.cache.flush()
+        os.remove(self.cache.path)
+        with mock.patch('time.time', return_value=1020.0):
+            self.cache.touch('a')
+            self.assertEqual(self.cache.lookup('a'), ({'body': '1'}, 0.0))
+        self.cache.flush()
+        self.assertFalse(os.path.exists(self.cache.path))
+
+
+class TokenCacheTest(unittest.TestCase):
+    # every process writes its tokens to the same file, each instance stands for one process
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        # created by the first write
+        patch = mock.patch('azext_connect._cache.get_cache_dir', return_value=os.path.join(self.cache_dir, 'connect'))
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.now = 1000.0
+        patch = mock.patch('time.time', side_effect=lambda: self.now)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def _cache(self):
+        return TokenCache('tokens.json', 300, 3600)
+
+    def _read(self):
+        with open(self._cache().path) as f:
+            return json.load(f)
+
+    def test_refresh_skew(self):
+        cache = self._cache()
+        cache.set_token('arm', {'accessToken': 'arm'}, self.now + 301)
+        cache.set_token('graph', {'accessToken': 'graph'}, self.now + 299)
+        self.assertEqual(cache.get_token('arm'), {'accessToken': 'arm'})
+        # about to expire, the caller gets a fresh one
+        self.assertIsNone(cache.get_token('graph'))
+        self.now += 2
+        self.assertIsNone(cache.get_token('arm'))
+        self.assertIsNone(self._cache().get_token('arm'))
+
+    def test_drop_expired(self):
+        cache = self._cache()
+        cache.set_token('arm', {'accessToken': 'arm'}, self.now + 10)
+        self.now += 20
+        cache.set_token('graph', {'accessToken': 'graph'}, self.now + 3600)
+        self.assertEqual(sorted(self._read()), ['graph'])
+
+    def test_merge_other_processes(self):
+        first, second = self._cache(), self._cache()
+        # the first process read the file before the second one wrote its token
+        self.assertIsNone(first.get_token('graph'))
+        second.set_token('graph', {'accessToken': 'graph'}, self.now + 3600)
+        first.set_token('arm', {'accessToken': 'arm'}, self.now + 3600)
+        self.assertEqual(sorted(self._read()), ['arm', 'graph'])
+        self.assertEqual(first.get_token('graph'), {'accessToken': 'graph'})
+
+    def test_concurrent_set_token(self):
+        caches = [self._cache() for _ in range(8)]
+        for cache in caches:
+            cache.get_token('arm')
+        threads = [threading.Thread(target=cache.set_token, args=(str(index), {'accessToken': str(index)}, self.now + 3600))
+                   for index, cache in enumerate(caches)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(self._read()), [str(index) for index in range(8)])
+
+    @unittest.skipIf(os.name == 'nt', 'file modes are not enforced on Windows')
+    def test_private_file(self):
+        cache = self._cache()
+        cache.set_token('arm', {'accessToken': 'arm'}, self.now + 3600)
+        self.assertEqual(stat.S_IMODE(os.stat(cache.path).st_mode), 0o600)
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.dirname(cache.path)).st_mode) & 0o077, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
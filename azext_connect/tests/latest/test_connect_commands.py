@@ -0,0 +1,43 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import unittest
+from unittest import mock
+
+from azure.cli.core.mock import DummyCli
+
+from azext_connect import ConnectCommandsLoader
+
+NO_WAIT_COMMANDS = ['connect webapp bind', 'connect springcloud bind', 'connect function bind', 'connect validate',
+                    'connect batch-bind', 'connect apply']
+
+
+class CommandTableTest(unittest.TestCase):
+    # azure-cli drops handler parameters such as no_wait and raw, check they reach the parser
+
+    def _load(self, name):
+        cli = DummyCli()
+        cli.invocation = mock.Mock(data={'command_string': name})
+        loader = ConnectCommandsLoader(cli_ctx=cli)
+        command = loader.load_command_table(None)[name]
+        command.load_arguments()
+        loader.command_name = name
+        loader.load_arguments(name)
+        return command, loader.argument_registry.arguments.get(name, {})
+
+    def test_no_wait(self):
+        for name in NO_WAIT_COMMANDS:
+            command, _ = self._load(name)
+            self.assertTrue(command.supports_no_wait, name)
+            self.assertIn('no_wait', command.arguments, name)
+
+    def test_raw(self):
+        for name in ['connect get', 'connect validate']:
+            command, registry = self._load(name)
+            self.assertIn('raw_output', command.arguments, name)
+            self.assertEqual(registry['raw_output'].settings['options_list'], ['--raw'])
+
+
+if __name__ == '__main__':
+    unittest.main()
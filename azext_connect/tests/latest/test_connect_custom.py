@@ -0,0 +1,83 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from azure.mgmt.cosmosdb.operations import DatabaseAccountsOperations
+from azure.mgmt.rdbms.postgresql.operations import ServersOperations
+
+from knack.util import CLIError
+
+from azext_connect import custom
+
+SERVER_ID = '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.DBforPostgreSQL/servers/server'
+COSMOS_ID = '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.DocumentDb/databaseAccounts/account'
+
+
+class ManagementClientTest(unittest.TestCase):
+    # the CosmosDB and Postgres lookups call the management SDK in process instead of a nested az
+
+    def setUp(self):
+        self.cmd = mock.Mock()
+        self.client = mock.Mock()
+        patches = [
+            mock.patch('azure.cli.core.commands.client_factory.get_mgmt_service_client', return_value=self.client),
+            mock.patch('azure.cli.core.get_default_cli'),
+            mock.patch('azure.cli.core.commands.LongRunningOperation')
+        ]
+        self.get_client, self.get_default_cli, self.long_running_operation = [patch.start() for patch in patches]
+        for patch in patches:
+            self.addCleanup(patch.stop)
+
+    def test_update_postgres_server(self):
+        self.client.servers = mock.create_autospec(ServersOperations, instance=True)
+        custom._update_postgres_server(self.cmd, SERVER_ID, 'password')
+        self.assertEqual(self.get_client.call_args[1]['subscription_id'], 'sub')
+        args = self.client.servers.begin_update.call_args[0]
+        self.assertEqual(args[:2], ('rg', 'server'))
+        self.assertEqual(args[2].administrator_login_password, 'password')
+        self.long_running_operation.return_value.assert_called_once_with(self.client.servers.begin_update.return_value)
+        self.get_default_cli.assert_not_called()
+
+    def test_show_cosmos_database_type(self):
+        self.client.database_accounts = mock.create_autospec(DatabaseAccountsOperations, instance=True)
+        capability = mock.Mock()
+        capability.name = 'EnableTable'
+        self.client.database_accounts.get.return_value = mock.Mock(kind='GlobalDocumentDB', capabilities=[capability])
+        self.assertEqual(custom._show_cosmos_database_type(self.cmd, COSMOS_ID), 'tables')
+        self.client.database_accounts.get.assert_called_once_with('rg', 'account')
+        self.get_default_cli.assert_not_called()
+
+
+class LoadManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+
+    def _write(self, file_name, content):
+        path = os.path.join(self.workdir, file_name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_load(self):
+        for file_name, content in [('manifest.json', '{"connections": [{"name": "conn"}]}'),
+                                   ('manifest.yaml', 'connections:\n- name: conn\n')]:
+            self.assertEqual(custom._load_manifest(self._write(file_name, content)), [{'name': 'conn'}])
+
+    def test_invalid(self):
+        for file_name, content in [('manifest.json', '{"connections": ['), ('manifest.yml', 'connections: [name: {'),
+                                   ('missing.yaml', None)]:
+            path = self._write(file_name, content) if content else os.path.join(self.workdir, file_name)
+            with self.assertRaisesRegex(CLIError, 'Fail to load manifest'):
+                custom._load_manifest(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'benchmarks')
+
+
+@unittest.skipUnless(os.path.isfile(os.path.join(BENCHMARK_DIR, 'fake_cupertino.py')), 'benchmarks/ is not available')
+class FakeServiceTest(unittest.TestCase):
+    # the commands of the benchmark against fake_cupertino.py, so a change which breaks them or sends
+    # more requests fails here instead of only showing up as a slower benchmark
+
+    def setUp(self):
+        sys.path.insert(0, BENCHMARK_DIR)
+        self.addCleanup(sys.path.remove, BENCHMARK_DIR)
+        from bench_client import FakeCommand, SUBSCRIPTION, _fake_access_token
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+        self.cmd = FakeCommand()
+        self.subscription = SUBSCRIPTION
+        self.patches = [
+            mock.patch('azure.cli.command_modules.profile.custom.get_access_token', _fake_access_token),
+            mock.patch('azext_connect.custom.get_subscription_id', lambda cli_ctx: SUBSCRIPTION),
+            mock.patch('azext_connect._cache.get_cache_dir', lambda: self.workdir),
+            # pick up the rate ceilings of the environment below
+            mock.patch('azext_connect._apis._rate_limiter', None)
+        ]
+
+    def _start(self, max_rps=None):
+        from fake_cupertino import FakeCupertinoServer
+        self.server = FakeCupertinoServer(max_rps=max_rps).start()
+        self.addCleanup(self.server.stop)
+        environ = {'LOCAL_CONN_HOST': self.server.host, 'AZURE_CONFIG_DIR': self.workdir}
+        if max_rps:
+            # let the fake service throttle instead of the client
+            environ['CONNECT_RATE_LIMIT_READS'] = environ['CONNECT_RATE_LIMIT_WRITES'] = '100000'
+        for patch in self.patches + [mock.patch.dict('os.environ', environ)]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _run(self, func, *args, **kwargs):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            func(self.cmd, *args, **kwargs)
+        return json.loads(out.getvalue())
+
+    def _stats(self):
+        import requests
+        return requests.get(self.server.host + '/_stats').json()
+
+    def _write_manifest(self, count):
+        manifest = os.path.join(self.workdir, 'manifest.json')
+        with open(manifest, 'w') as f:
+            json.dump({'connections': [{
+                'name': 'batch{0}'.format(index),
+                'source': {'type': 'webapp', 'app': 'app{0}'.format(index)},
+                'target': {'keyvault': 'vault{0}'.format(index)},
+                'auth': {'type': 'MSI'}
+            } for index in range(count)]}, f)
+        return manifest
+
+    def test_commands(self):
+        from azext_connect import custom
+        self._start()
+        result = self._run(custom.bind_webapp, 'bench-rg', 'conn0', 'app0', authtype='MSI', keyvault='vault0')
+        self.assertEqual(result['name'], 'conn0')
+        self.assertEqual(result['properties']['sourceId'].lower(),
+                         '/subscriptions/{0}/resourcegroups/bench-rg/providers/microsoft.web/sites/app0'.format(
+                             self.subscription))
+        self.assertEqual(result['properties']['authInfo']['authType'], 'SystemAssignedIdentity')
+        self.assertIn((self.subscription, 'bench-rg', 'conn0'), self.server.connections)
+
+        self.assertEqual(self._run(custom.get_general, 'bench-rg', 'conn0', no_cache=True), result)
+        self.assertEqual(self._run(custom.validate_general, 'bench-rg', ['conn0'])['isConnectionAvailable'], True)
+
+        results = self._run(custom.batch_bind, self._write_manifest(10), 'bench-rg')
+        self.assertEqual([entry['status'] for entry in results], ['Succeeded'] * 10)
+        self.assertEqual(len(self.server.connections), 11)
+        # one request per command and per connection of the batch
+        self.assertEqual(self._stats(), {'requests': 13, 'throttled': 0, 'failed': 0})
+
+    def test_throttled(self):
+        from azext_connect import custom
+        self._start(max_rps=4)
+        results = self._run(custom.batch_bind, self._write_manifest(10), 'bench-rg', max_parallel=10)
+        self.assertEqual([entry['status'] for entry in results], ['Succeeded'] * 10)
+        # the throttled requests were retried until all of them went through
+        stats = self._stats()
+        self.assertGreater(stats['throttled'], 0)
+        self.assertEqual(stats['requests'], 10 + stats['throttled'])
+        self.assertEqual(stats['failed'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
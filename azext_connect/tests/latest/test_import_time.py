@@ -0,0 +1,71 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import os
+import subprocess
+import sys
+import unittest
+
+import azext_connect
+
+# az imports the extension on every invocation, azure.cli.core is loaded by then
+PRELOAD = 'azure.cli.core'
+BUDGET_MS = 50.0
+RUNS = 5
+
+# modules which only the commands calling the service should load
+LAZY_MODULES = [
+    'requests',
+    'urllib3',
+    'knack.prompting',
+    'azure.cli.command_modules.profile.custom',
+    'azext_connect.custom',
+    'azext_connect._apis',
+    'azext_connect._params',
+    'azext_connect.commands',
+]
+
+
+def _import_time(module):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(azext_connect.__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import {0}; import {1}'.format(PRELOAD, module)],
+        stderr=subprocess.PIPE, universal_newlines=True, env=env, check=True
+    )
+    cumulative = None
+    loaded = set()
+    # modules are listed once fully imported, so what the preload needs comes before its own line
+    preloaded = False
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        fields = [field.strip() for field in line[len('import time:'):].split('|')]
+        if not fields[1].isdigit():
+            continue
+        if not preloaded:
+            preloaded = fields[2] == PRELOAD
+            continue
+        loaded.add(fields[2])
+        if fields[2] == module:
+            cumulative = int(fields[1]) / 1000.0
+    return cumulative, loaded
+
+
+class ImportTimeTest(unittest.TestCase):
+
+    def test_lazy_modules(self):
+        _, loaded = _import_time('azext_connect')
+        self.assertIn('azext_connect', loaded)
+        self.assertEqual(sorted(name for name in LAZY_MODULES if name in loaded), [])
+
+    def test_budget(self):
+        # the best of a few runs, a single one is noisy on a busy machine
+        best = min(_import_time('azext_connect')[0] for _ in range(RUNS))
+        self.assertLess(best, BUDGET_MS, 'import azext_connect took {0:.1f} ms'.format(best))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import json
+import unittest
+from unittest import mock
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+from azext_connect._apis import CupertinoApi, RateLimiter, RetryPolicy, decode_operation, encode_operation
+from azext_connect._model import AuthInfo, AuthType
+
+HOST = 'https://cupertino.example.com'
+CONNECTION_URI = HOST + '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Cupertino/connections/conn'
+SOURCE_ID = '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Web/sites/app'
+TARGET_ID = '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.KeyVault/vaults/vault'
+OPERATION_URL = HOST + '/operations/1'
+
+
+def _response(status_code, body=None, headers=None):
+    res = Response()
+    res.status_code = status_code
+    res._content = json.dumps(body).encode('utf-8') if body is not None else b''
+    res.headers = CaseInsensitiveDict(headers or {})
+    return res
+
+
+class LongRunningOperationTest(unittest.TestCase):
+    # the service is replaced by a script of responses, one per request in the order they are sent
+
+    def setUp(self):
+        with mock.patch.dict('os.environ', {'LOCAL_CONN_HOST': HOST}):
+            self.api = CupertinoApi({'accessToken': 'token'}, response_cache=None, compress_requests=False,
+                                    retry_policy=RetryPolicy(max_attempts=1),
+                                    rate_limiter=RateLimiter({'reads': 0, 'writes': 0}))
+        self.responses = []
+        self.requests = []
+        patches = [
+            mock.patch.object(self.api._session, 'request', side_effect=self._request),
+            mock.patch('azext_connect._apis.time.sleep')
+        ]
+        self.sleep = [patch.start() for patch in patches][1]
+        for patch in patches:
+            self.addCleanup(patch.stop)
+
+    def _request(self, method, url, **kwargs):  # pylint: disable=unused-argument
+        self.requests.append((method, url))
+        res = self.responses.pop(0)
+        res.url = url
+        res.request = mock.Mock(method=method)
+        return res
+
+    def _create(self, no_wait=False):
+        return self.api.create('sub', 'rg', 'conn', SOURCE_ID, TARGET_ID, AuthInfo(AuthType.MSI), no_wait=no_wait)
+
+    def test_async_operation(self):
+        self.responses = [
+            _response(201, {'name': 'conn'}, {'Azure-AsyncOperation': OPERATION_URL, 'Location': HOST + '/locations/1'}),
+            _response(200, {'status': 'InProgress'}, {'Retry-After': '7'}),
+            _response(200, {'status': 'Succeeded'}),
+            _response(200, {'name': 'conn', 'properties': {'provisioningState': 'Succeeded'}})
+        ]
+        res = self._create()
+        self.assertEqual(json.loads(res.content)['properties']['provisioningState'], 'Succeeded')
+        # the status is read from Azure-AsyncOperation, then a PUT reads the connection once more
+        self.assertEqual(self.requests, [('PUT', CONNECTION_URI), ('GET', OPERATION_URL), ('GET', OPERATION_URL),
+                                         ('GET', CONNECTION_URI)])
+        self.assertEqual([call[0][0] for call in self.sleep.call_args_list], [1, 7])
+
+    def test_location_only(self):
+        location = '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Cupertino/locations/1'
+        self.responses = [
+            _response(202, headers={'Location': location, 'Retry-After': '3'}),
+            _response(202),
+            _response(200, {'status': 'Succeeded', 'isConnectionAvailable': True})
+        ]
+        res = self.api.validate('sub', 'rg', 'conn')
+        self.assertEqual(json.loads(res.content)['isConnectionAvailable'], True)
+        # a relative Location is resolved against the request URL
+        self.assertEqual(self.requests, [('POST', CONNECTION_URI + '/validateConnectivity'), ('GET', HOST + location),
+                                         ('GET', HOST + location)])
+        self.assertEqual([call[0][0] for call in self.sleep.call_args_list], [3, 1.5])
+
+    def test_failed_status(self):
+        self.responses = [
+            _response(201, headers={'Azure-AsyncOperation': OPERATION_URL}),
+            _response(200, {'status': 'Failed', 'error': {'code': 'Conflict'}})
+        ]
+        with self.assertRaisesRegex(Exception, 'ended with status failed'):
+            self._create()
+
+    def test_canceled_status(self):
+        self.responses = [
+            _response(202, headers={'Azure-AsyncOperation': OPERATION_URL}),
+            _response(200, {'status': 'Canceled'})
+        ]
+        with self.assertRaisesRegex(Exception, 'ended with status canceled'):
+            self.api.validate('sub', 'rg', 'conn')
+
+    def test_off_host_url(self):
+        self.responses = [_response(201, headers={'Azure-AsyncOperation': 'https://evil.example.com/operations/1'})]
+        with self.assertRaisesRegex(Exception, 'is not on'):
+            self._create()
+        self.assertEqual(len(self.requests), 1)
+
+    def test_final_response(self):
+        # a 200 or a 201 without operation headers is not polled
+        self.responses = [_response(200, {'name': 'conn'})]
+        self.assertEqual(self._create().status_code, 200)
+        self.assertEqual(len(self.requests), 1)
+
+    def test_wait_handle(self):
+        self.responses = [_response(201, {'name': 'conn'}, {'Azure-AsyncOperation': OPERATION_URL})]
+        res = self._create(no_wait=True)
+        self.assertEqual(res.status_code, 201)
+        handle = self.api.get_operation(res)
+        operation = decode_operation(handle)
+        self.assertEqual(encode_operation(operation), handle)
+        self.assertEqual((operation['method'], operation['name'], operation['resourceGroup']), ('PUT', 'conn', 'rg'))
+
+        self.responses = [_response(200, {'status': 'Succeeded'}), _response(200, {'name': 'conn'})]
+        res = self.api.wait(handle)
+        self.assertEqual(json.loads(res.content), {'name': 'conn'})
+        self.assertEqual(self.requests[1:], [('GET', OPERATION_URL), ('GET', CONNECTION_URI)])
+
+    def test_invalid_handle(self):
+        with self.assertRaisesRegex(Exception, 'is not valid'):
+            decode_operation('not-a-handle')
+
+
+if __name__ == '__main__':
+    unittest.main()
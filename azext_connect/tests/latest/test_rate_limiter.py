@@ -0,0 +1,53 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import unittest
+from unittest import mock
+
+from azext_connect._apis import RATE_LIMIT_COOLDOWN, RateLimiter
+
+KEY = ('sub', 'writes')
+
+
+def _response(status_code, retry_after=None):
+    return mock.Mock(status_code=status_code, headers={'Retry-After': retry_after} if retry_after else {})
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patch = mock.patch('time.time', side_effect=lambda: self.now)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.limiter = RateLimiter({'writes': 50.0}, max_concurrency=64)
+
+    def _send(self, count, status_code, retry_after=None):
+        for _ in range(count):
+            self.assertEqual(self.limiter.acquire(KEY), 0)
+        for _ in range(count):
+            self.limiter.release(KEY, _response(status_code, retry_after))
+
+    def test_block_once_per_cooldown(self):
+        self._send(40, 200)
+        self.now += 0.5
+        # the 429s of one burst halve the rate measured over the last second and block the bucket once
+        self._send(1, 429, '2')
+        bucket = self.limiter._buckets[KEY]
+        self.assertEqual(bucket.blocked_until, self.now + 2)
+        self.assertEqual(bucket.rate, 20.5)
+        self.now += 0.5
+        self.limiter._buckets[KEY].in_flight += 1
+        self.limiter.release(KEY, _response(429, '10'))
+        self.assertEqual(bucket.blocked_until, self.now + 1.5)
+        self.assertEqual(bucket.rate, 20.5)
+        # after the cooldown a new 429 blocks again
+        self.now += RATE_LIMIT_COOLDOWN + 1.5
+        self._send(1, 429, '3')
+        self.assertEqual(bucket.blocked_until, self.now + 3)
+        self.assertLess(bucket.rate, 20.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import unittest
+
+from azext_connect._resource_id import ResourceId
+
+DATABASE_ID = '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Sql/servers/server/databases/db'
+
+
+class ResourceIdTest(unittest.TestCase):
+
+    def test_build(self):
+        scope = ResourceId.from_parts('sub', 'rg')
+        self.assertEqual(str(scope), '/subscriptions/sub/resourceGroups/rg')
+        server = scope.resource('Microsoft.Sql', 'servers', 'server')
+        self.assertEqual(str(server.child('databases', 'db')), DATABASE_ID)
+        # a resource of a resource belongs to its resource group
+        self.assertEqual(str(server.resource('Microsoft.Web', 'sites', 'app')),
+                         '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Web/sites/app')
+        self.assertEqual(str(ResourceId.from_parts('sub', 'rg', 'Microsoft.Sql', ('servers', 'server', 'databases', 'db'))),
+                         DATABASE_ID)
+
+    def test_parse(self):
+        resource_id = ResourceId.parse(DATABASE_ID + '/')
+        self.assertEqual(str(resource_id), DATABASE_ID)
+        self.assertEqual(resource_id.subscription, 'sub')
+        self.assertEqual(resource_id.resource_group, 'rg')
+        self.assertEqual(resource_id.namespace, 'Microsoft.Sql')
+        self.assertEqual(resource_id.segments, ('servers', 'server', 'databases', 'db'))
+        self.assertEqual((resource_id.resource_type, resource_id.resource_name, resource_id.name),
+                         ('servers', 'server', 'db'))
+        scope = ResourceId.parse('/SUBSCRIPTIONS/sub/resourcegroups/rg')
+        self.assertEqual((scope.resource_group, scope.namespace, scope.resource_type, scope.name), ('rg', None, None, 'rg'))
+        self.assertEqual(ResourceId.parse(DATABASE_ID.upper()), resource_id)
+        self.assertEqual(len({ResourceId.parse(DATABASE_ID.upper()), resource_id}), 1)
+
+    def test_parse_invalid(self):
+        for value in ['', '/subscriptions/', 'subscriptions/sub', '/subscriptions/sub/resourceGroups',
+                      '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Sql/servers',
+                      '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Sql/servers//databases/db',
+                      '/subscriptions/sub/resources/rg']:
+            with self.assertRaises(Exception):
+                ResourceId.parse(value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,259 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+# Offline benchmark of the connect commands against the local Cupertino stand-in in fake_cupertino.py.
+# Token acquisition and the subscription lookup are stubbed, so no Azure account or network is needed,
+# only the azure-cli dev environment:
+#
+#     python benchmarks/bench_client.py --count 200 --latency-ms 20 --max-parallel 16
+#     python benchmarks/bench_client.py --save-baseline baseline.json
+#     python benchmarks/bench_client.py --baseline baseline.json --tolerance 0.2
+#
+# Every scenario reports p50/p95/p99 latency of the commands and of the HTTP requests they send,
+# throughput and peak traced memory. The stand-in runs in its own process so it does not compete for
+# the GIL, and memory is traced in a second pass so tracemalloc does not skew the timings. With
+# --baseline the script fails when a scenario got slower than the baseline by more than the tolerance.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+SUBSCRIPTION = '00000000-0000-0000-0000-000000000000'
+RESOURCE_GROUP = 'bench-rg'
+SCENARIOS = ['bind', 'get', 'get-cached', 'validate', 'batch-bind', 'validate-bulk']
+
+
+class FakeCommand(object):
+    cli_ctx = None
+
+
+def _fake_access_token(cmd, subscription=None, resource=None, resource_type=None, tenant=None):  # pylint: disable=unused-argument
+    return {
+        'tokenType': 'Bearer',
+        'accessToken': 'fake-token-for-{0}'.format(resource or resource_type or 'arm'),
+        'expiresOn': '2999-01-01 00:00:00.000000',
+        'subscription': SUBSCRIPTION,
+        'tenant': SUBSCRIPTION
+    }
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, int(round(percent / 100.0 * len(ordered) + 0.5)) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def summarize(values):
+    return {
+        'p50_ms': round(percentile(values, 50) * 1000, 3),
+        'p95_ms': round(percentile(values, 95) * 1000, 3),
+        'p99_ms': round(percentile(values, 99) * 1000, 3)
+    }
+
+
+class Recorder(object):
+    # wraps the shared session of the extension to time every HTTP request
+
+    def __init__(self, session):
+        self._request = session.request
+        self._lock = threading.Lock()
+        self.latencies = []
+        session.request = self.request
+
+    def request(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._request(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.latencies.append(time.perf_counter() - start)
+
+
+def _run_command(func, *args, **kwargs):
+    # commands print their result and exit on failure, count an exit as an error
+    try:
+        func(*args, **kwargs)
+        return True
+    except SystemExit as e:
+        return not e.code
+
+
+class ServerProcess(object):
+    # fake_cupertino.py running in a child process
+
+    def __init__(self, args):
+        command = [sys.executable, os.path.join(BENCHMARK_DIR, 'fake_cupertino.py'), '--port', '0',
+                   '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+                   '--error-rate', str(args.error_rate)]
+        if args.max_rps:
+            command += ['--max-rps', str(args.max_rps)]
+        self._process = subprocess.Popen(command, stdout=subprocess.PIPE, universal_newlines=True)
+        self.host = self._process.stdout.readline().split()[-1]
+
+    def stats(self):
+        import requests
+        return requests.get(self.host + '/_stats').json()
+
+    def stop(self):
+        self._process.terminate()
+        self._process.wait()
+
+
+def run_scenario(name, custom, recorder, args, workdir, trace_memory=False):
+    cmd = FakeCommand()
+    names = ['conn{0}'.format(i) for i in range(args.count)]
+    latencies = []
+    errors = 0
+    recorder.latencies = []
+
+    def _timed(func, *func_args, **func_kwargs):
+        start = time.perf_counter()
+        ok = _run_command(func, *func_args, **func_kwargs)
+        latencies.append(time.perf_counter() - start)
+        return ok
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        if name == 'bind':
+            for index, connection in enumerate(names):
+                errors += not _timed(custom.bind_webapp, cmd, RESOURCE_GROUP, connection, 'app{0}'.format(index),
+                                     authtype='MSI', keyvault='vault{0}'.format(index))
+        elif name == 'get':
+            for connection in names:
+                errors += not _timed(custom.get_general, cmd, RESOURCE_GROUP, connection, no_cache=True)
+        elif name == 'get-cached':
+            for connection in names:
+                errors += not _timed(custom.get_general, cmd, RESOURCE_GROUP, connection)
+        elif name == 'validate':
+            for connection in names:
+                errors += not _timed(custom.validate_general, cmd, RESOURCE_GROUP, [connection])
+        elif name == 'batch-bind':
+            manifest = os.path.join(workdir, 'manifest.json')
+            with open(manifest, 'w') as f:
+                json.dump({'connections': [{
+                    'name': connection,
+                    'source': {'type': 'webapp', 'app': 'app{0}'.format(index)},
+                    'target': {'keyvault': 'vault{0}'.format(index)},
+                    'auth': {'type': 'MSI'}
+                } for index, connection in enumerate(names)]}, f)
+            errors += not _timed(custom.batch_bind, cmd, manifest, RESOURCE_GROUP, max_parallel=args.max_parallel)
+        elif name == 'validate-bulk':
+            errors += not _timed(custom.validate_general, cmd, RESOURCE_GROUP, None, max_parallel=args.max_parallel)
+    elapsed = time.perf_counter() - start
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak
+    result = {
+        'scenario': name,
+        'operations': args.count,
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_ops': round(args.count / elapsed, 2) if elapsed else 0.0,
+        'requests': len(recorder.latencies),
+        'command': summarize(latencies),
+        'request': summarize(recorder.latencies)
+    }
+    return result
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    previous = {result['scenario']: result for result in baseline}
+    for result in results:
+        base = previous.get(result['scenario'])
+        if not base:
+            continue
+        if result['throughput_ops'] < base['throughput_ops'] * (1 - tolerance):
+            regressions.append('{0}: throughput {1} < {2}'.format(
+                result['scenario'], result['throughput_ops'], base['throughput_ops']))
+        if result['command']['p95_ms'] > base['command']['p95_ms'] * (1 + tolerance):
+            regressions.append('{0}: p95 {1} ms > {2} ms'.format(
+                result['scenario'], result['command']['p95_ms'], base['command']['p95_ms']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the connect commands against a local Cupertino stand-in.')
+    parser.add_argument('--scenario', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--count', type=int, default=100, help='connections per scenario')
+    parser.add_argument('--max-parallel', type=int, default=10)
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--max-rps', type=int, default=None)
+    parser.add_argument('--rate-limit', action='store_true',
+                        help='keep the default rate ceilings of the client instead of raising them out of the way')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='fail when slower than the results in this file')
+    parser.add_argument('--save-baseline', help='write the results to this file as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+
+    parser.add_argument('--no-memory', action='store_true', help='skip the memory tracing pass')
+    args = parser.parse_args()
+
+    server = ServerProcess(args)
+    workdir = tempfile.mkdtemp(prefix='connect-bench-')
+    os.environ['LOCAL_CONN_HOST'] = server.host
+    os.environ['AZURE_CONFIG_DIR'] = workdir
+    if not args.rate_limit:
+        # the limiter still runs, but the ARM ceilings would hide the throughput of the client
+        os.environ['CONNECT_RATE_LIMIT_READS'] = os.environ['CONNECT_RATE_LIMIT_WRITES'] = '100000'
+
+    import azure.cli.command_modules.profile.custom as profile_custom
+    from azext_connect import custom, _apis
+    profile_custom.get_access_token = _fake_access_token
+    custom.get_subscription_id = lambda cli_ctx: SUBSCRIPTION
+    recorder = Recorder(_apis.get_session(max(args.max_parallel, _apis.DEFAULT_POOL_SIZE)))
+
+    results = []
+    try:
+        # the scenarios after bind read the connections it created
+        scenarios = [name for name in SCENARIOS if name in args.scenario]
+        if scenarios[0] not in ['bind', 'batch-bind']:
+            scenarios.insert(0, 'bind')
+        for name in scenarios:
+            result = run_scenario(name, custom, recorder, args, workdir)
+            if name in args.scenario:
+                peak = 0 if args.no_memory else run_scenario(name, custom, recorder, args, workdir, trace_memory=True)
+                result['peak_memory_kb'] = round(peak / 1024.0, 1)
+                results.append(result)
+                print('{scenario:<14} {throughput_ops:>9} ops/s  p50 {command[p50_ms]:>9} ms  p95 {command[p95_ms]:>9} ms  '
+                      'p99 {command[p99_ms]:>9} ms  requests {requests:>6}  errors {errors:>4}  '
+                      'peak {peak_memory_kb:>9} KiB'.format(**result))
+        stats = server.stats()
+    finally:
+        server.stop()
+    print('server: {requests} requests, {throttled} throttled, {failed} failed'.format(**stats))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print('regression: {0}'.format(regression))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+# Compares ResourceId with the string formatting and regex parsing it replaced in custom.py, for the
+# number of targets of a large manifest. No Azure environment is needed:
+#
+#     python benchmarks/bench_resource_id.py --count 50000 --resource-groups 20
+import argparse
+import gc
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from azext_connect._resource_id import ResourceId  # noqa: E402
+
+SUBSCRIPTION = '00000000-0000-0000-0000-000000000000'
+
+
+# the previous helpers of custom.py
+def _is_resourcid(resource):
+    return resource.startswith('/subscriptions/')
+
+
+def _get_rg_from_scope(scope):
+    if scope.startswith('/subscriptions'):
+        match = re.search(r"\/resourceGroups\/[^\/]+", scope)
+        if (match):
+            return match.group().split("/")[2]
+    raise Exception('Can not get resource group from {0}'.format(scope))
+
+
+def build_strings(targets):
+    ids = []
+    for rg, server, database in targets:
+        scope = '/subscriptions/{0}/resourceGroups/{1}'.format(SUBSCRIPTION, rg)
+        sql = server if _is_resourcid(server) else '{0}/providers/Microsoft.Sql/servers/{1}'.format(scope, server)
+        ids.append('{0}/databases/{1}'.format(sql, database))
+    return ids
+
+
+def build_resource_ids(targets):
+    ids = []
+    for rg, server, database in targets:
+        scope = ResourceId.from_parts(SUBSCRIPTION, rg)
+        ids.append(scope.resource('Microsoft.Sql', 'servers', server).child('databases', database))
+    return ids
+
+
+def parse_strings(ids):
+    # resource group, server and database the way the previous code could get them
+    return [(_get_rg_from_scope(value), value.split('/')[8], value.split('/')[10]) for value in ids]
+
+
+def parse_ids(ids):
+    return [(resource_id.resource_group, resource_id.resource_name, resource_id.name)
+            for resource_id in map(ResourceId.parse, ids)]
+
+
+def wrap_ids(ids):
+    # IDs returned by the service are well formed, they are wrapped without the validation of parse
+    return [(resource_id.resource_group, resource_id.resource_name, resource_id.name)
+            for resource_id in map(ResourceId, ids)]
+
+
+def timed(func, arg, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def traced(func, arg):
+    gc.collect()
+    tracemalloc.start()
+    result = func(arg)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ResourceId against the previous string code.')
+    parser.add_argument('--count', type=int, default=50000, help='number of target IDs')
+    parser.add_argument('--resource-groups', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # build every string at run time so none of them is shared with the source constants
+    targets = [('rg{0}'.format(index % args.resource_groups), 'server{0}'.format(index), 'db{0}'.format(index))
+               for index in range(args.count)]
+    strings = build_strings(targets)
+    assert [str(resource_id) for resource_id in build_resource_ids(targets)] == strings
+    assert parse_ids(strings) == wrap_ids(strings) == parse_strings(strings)
+
+    rows = [
+        ('build', 'format strings', build_strings, targets),
+        ('build', 'ResourceId', build_resource_ids, targets),
+        ('parse', 'regex + split', parse_strings, strings),
+        ('parse', 'ResourceId', wrap_ids, strings),
+        ('parse', 'ResourceId.parse', parse_ids, strings),
+    ]
+    print('{0:<6} {1:<18} {2:>10} {3:>12}'.format('', '', 'total ms', 'ns per ID'))
+    for phase, name, func, arg in rows:
+        best, _ = timed(func, arg, args.repeat)
+        print('{0:<6} {1:<18} {2:>10.1f} {3:>12.0f}'.format(phase, name, best * 1000, best * 1e9 / args.count))
+    print('')
+    # what the previous code held for the targets of a manifest, and what the current code holds
+    print('memory held by {0} built IDs:'.format(args.count))
+    print('  strings           {0:>10.1f} KiB'.format(traced(build_strings, targets) / 1024.0))
+    print('  ResourceId        {0:>10.1f} KiB'.format(traced(build_resource_ids, targets) / 1024.0))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,220 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+# Local stand-in for the Cupertino service, used by the benchmarks. Point the extension at it with
+# LOCAL_CONN_HOST=http://127.0.0.1:<port>. It keeps connections in memory and can add latency, random
+# 5xx errors and 429 throttling:
+#
+#     python benchmarks/fake_cupertino.py --port 8080 --latency-ms 20 --error-rate 0.01 --max-rps 200
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+CONNECTION_PATH = re.compile(
+    r'^/subscriptions/(?P<subscription>[^/]+)/resourceGroups/(?P<rg>[^/]+)'
+    r'/providers/Microsoft\.Cupertino/connections/(?P<name>[^/?]+)(?P<action>/validateConnectivity)?$', re.IGNORECASE
+)
+LIST_PATH = re.compile(
+    r'^/subscriptions/(?P<subscription>[^/]+)(/resourceGroups/(?P<rg>[^/]+))?'
+    r'/providers/Microsoft\.Cupertino/connections$', re.IGNORECASE
+)
+# responses are gzipped when the client accepts it, except small ones
+GZIP_MIN_SIZE = 1024
+
+
+class FakeCupertinoServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, max_rps=None,
+                 page_size=100, seed=None):
+        HTTPServer.__init__(self, address, FakeCupertinoHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.max_rps = max_rps
+        self.page_size = page_size
+        self.connections = {}
+        self.requests = 0
+        self.throttled = 0
+        self.failed = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = (0, 0)
+
+    @property
+    def host(self):
+        return 'http://{0}:{1}'.format(*self.server_address[:2])
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def admit(self):
+        # returns (None to serve the request or the status code to fail it with, requests left in this second)
+        with self._lock:
+            self.requests += 1
+            remaining = None
+            if self.max_rps:
+                second = int(time.time())
+                window_start, count = self._window
+                count = count + 1 if window_start == second else 1
+                self._window = (second, count)
+                remaining = max(0, self.max_rps - count)
+                if count > self.max_rps:
+                    self.throttled += 1
+                    return 429, remaining
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.failed += 1
+                return 503, remaining
+            return None, remaining
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'throttled': self.throttled, 'failed': self.failed}
+
+    def delay(self):
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        latency = max(0.0, self.latency_ms + jitter)
+        if latency:
+            time.sleep(latency / 1000.0)
+
+
+class FakeCupertinoHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # buffer the headers and the body into one write, separate writes stall on Nagle and delayed ACKs
+    wbufsize = -1
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if body and self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return json.loads(body.decode('utf-8')) if body else None
+
+    def _reply(self, status, body=None, headers=None):
+        content = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if len(content) >= GZIP_MIN_SIZE and 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            content = gzip.compress(content)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(content)))
+        if getattr(self, 'remaining', None) is not None:
+            # the quota header of ARM, one shared window for reads and writes
+            kind = 'reads' if self.command == 'GET' else 'writes'
+            self.send_header('x-ms-ratelimit-remaining-subscription-{0}'.format(kind), str(self.remaining))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if content:
+            self.wfile.write(content)
+
+    def _handle(self, method):
+        body = self._read_body()
+        if self.path == '/_stats':
+            return self._reply(200, self.server.stats())
+        status, self.remaining = self.server.admit()
+        self.server.delay()
+        if status == 429:
+            return self._reply(429, {'error': {'code': 'TooManyRequests'}}, {'Retry-After': '1'})
+        if status:
+            return self._reply(status, {'error': {'code': 'ServiceUnavailable'}})
+        path, _, query = self.path.partition('?')
+        match = CONNECTION_PATH.match(path)
+        if match:
+            return self._handle_connection(method, match, body)
+        match = LIST_PATH.match(path)
+        if match and method == 'GET':
+            return self._handle_list(match, query)
+        return self._reply(404, {'error': {'code': 'NotFound'}})
+
+    def _handle_connection(self, method, match, body):
+        key = (match.group('subscription').lower(), match.group('rg').lower(), match.group('name').lower())
+        path = self.path.partition('?')[0]
+        if match.group('action'):
+            if method != 'POST':
+                return self._reply(405)
+            if key not in self.server.connections:
+                return self._reply(404, {'error': {'code': 'NotFound'}})
+            return self._reply(200, {'name': match.group('name'), 'status': 'Succeeded', 'isConnectionAvailable': True})
+        if method == 'PUT':
+            resource = {
+                'id': path,
+                'name': match.group('name'),
+                'type': 'Microsoft.Cupertino/connections',
+                'properties': dict((body or {}).get('properties') or {}, provisioningState='Succeeded')
+            }
+            self.server.connections[key] = resource
+            return self._reply(200, resource)
+        if method == 'GET':
+            resource = self.server.connections.get(key)
+            if resource is None:
+                return self._reply(404, {'error': {'code': 'NotFound'}})
+            etag = '"{0}"'.format(hashlib.sha1(json.dumps(resource, sort_keys=True).encode('utf-8')).hexdigest())
+            if self.headers.get('If-None-Match') == etag:
+                return self._reply(304, headers={'ETag': etag})
+            return self._reply(200, resource, {'ETag': etag})
+        return self._reply(405)
+
+    def _handle_list(self, match, query):
+        subscription = match.group('subscription').lower()
+        rg = (match.group('rg') or '').lower()
+        keys = sorted(key for key in self.server.connections if key[0] == subscription and (not rg or key[1] == rg))
+        skip = int(query.split('skip=')[1].split('&')[0]) if 'skip=' in query else 0
+        page = keys[skip:skip + self.server.page_size]
+        result = {'value': [self.server.connections[key] for key in page]}
+        if skip + self.server.page_size < len(keys):
+            result['nextLink'] = '{0}{1}?skip={2}'.format(
+                self.server.host, self.path.partition('?')[0], skip + self.server.page_size)
+        return self._reply(200, result)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_POST(self):
+        self._handle('POST')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local stand-in for the Cupertino service.')
+    parser.add_argument('--port', type=int, default=8080, help='0 picks a free port')
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests failed with 503')
+    parser.add_argument('--max-rps', type=int, default=None, help='requests per second before replying 429')
+    parser.add_argument('--page-size', type=int, default=100)
+    args = parser.parse_args()
+    server = FakeCupertinoServer(('127.0.0.1', args.port), args.latency_ms, args.jitter_ms, args.error_rate,
+                                 args.max_rps, args.page_size)
+    print('Serving on {0}'.format(server.host))
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()